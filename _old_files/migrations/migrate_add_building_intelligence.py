@@ -14,110 +14,153 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable must be set")
 
+# Desired buildings schema: (column, type). Includes the columns later added by
+# migrate_add_dual_owner_fields.py and migrate_add_hpd_fields.py, so a fresh
+# database gets the final table in one statement and an existing one is
+# brought up to date with a single ALTER TABLE.
+# Dollar amounts are whole dollars (BIGINT): fixed-width and cheaper to
+# SUM/AVG than NUMERIC; cents aren't meaningful here.
+# Columns are declared in alignment order - 8-byte, then 4-byte, then
+# variable-length - so a fresh table has no padding between them.
+BUILDINGS_COLUMNS = [
+    ("id", "SERIAL PRIMARY KEY"),
+    ("purchase_date", "DATE"),              # pairs with id to fill 8 bytes
+    
+    # 8-byte: dollar amounts and timestamps
+    ("purchase_price", "BIGINT"),
+    ("mortgage_amount", "BIGINT"),
+    ("assessed_land_value", "BIGINT"),
+    ("assessed_total_value", "BIGINT"),
+    ("estimated_value", "BIGINT"),
+    ("estimated_annual_rent", "BIGINT"),
+    ("estimated_equity", "BIGINT"),
+    ("last_updated", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+    
+    # 4-byte: PLUTO basics and HPD quality indicators
+    ("residential_units", "INTEGER"),
+    ("total_units", "INTEGER"),
+    ("year_built", "INTEGER"),
+    ("year_altered", "INTEGER"),
+    ("num_floors", "INTEGER"),
+    ("building_sqft", "INTEGER"),
+    ("lot_sqft", "INTEGER"),
+    ("hpd_open_violations", "INTEGER DEFAULT 0"),
+    ("hpd_total_violations", "INTEGER DEFAULT 0"),
+    ("hpd_open_complaints", "INTEGER DEFAULT 0"),
+    ("hpd_total_complaints", "INTEGER DEFAULT 0"),
+    
+    # Variable-length: identifiers, PLUTO codes, owners
+    # (PLUTO corporate entity, RPAD taxpayer, HPD registration)
+    ("bbl", "TEXT UNIQUE NOT NULL"),
+    ("address", "TEXT"),
+    ("borough", "TEXT"),
+    ("block", "TEXT"),
+    ("lot", "TEXT"),
+    ("bin", "TEXT"),
+    ("building_class", "TEXT"),
+    ("land_use", "TEXT"),
+    ("current_owner_name", "TEXT"),
+    ("owner_name_rpad", "TEXT"),
+    ("owner_name_hpd", "TEXT"),
+    ("value_source", "TEXT"),
+    ("estimated_rent_per_unit", "DECIMAL(10,2)"),
+    ("hpd_registration_id", "TEXT"),
+]
+
+# Columns removed from buildings (owner_mailing_address held the property address)
+BUILDINGS_DROPPED_COLUMNS = ["owner_mailing_address"]
+
+
+def sync_table_columns(cur, table, columns, dropped=()):
+    """
+    Create `table` from `columns` if it doesn't exist, otherwise add the
+    missing columns and drop `dropped` ones in one ALTER TABLE (one lock).
+    """
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(f'{name} {col_type}' for name, col_type in columns)})")
+    cur.execute("""
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+    """, (table,))
+    existing = {row[0] for row in cur.fetchall()}
+    
+    clauses = [f"ADD COLUMN {name} {col_type}" for name, col_type in columns if name not in existing]
+    clauses += [f"DROP COLUMN {name}" for name in dropped if name in existing]
+    if clauses:
+        cur.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+        print(f"   ✓ {table}: {len(clauses)} column change(s)")
+
+def create_index_concurrently(conn, sql):
+    """
+    Build an index without blocking writes to a live table.
+    CONCURRENTLY can't run inside a transaction block, so use autocommit.
+    """
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+    finally:
+        conn.autocommit = False
+
 def run_migration():
-    """Create building intelligence tables"""
+    """
+    Create building intelligence tables.
+    All table/column DDL runs in one transaction, so a failure leaves nothing
+    half-applied; the CONCURRENTLY index builds (which can't run inside a
+    transaction) follow once it has committed.
+    """
     conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = False
     cur = conn.cursor()
     
     print("Starting migration: Building Intelligence System")
     print("=" * 60)
     
-    # 1. Buildings table - core hub
-    print("\n1. Creating buildings table...")
     try:
+        # 1. Buildings table - core hub
+        print("\n1. Creating buildings table...")
+        sync_table_columns(cur, 'buildings', BUILDINGS_COLUMNS, BUILDINGS_DROPPED_COLUMNS)
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS buildings (
-                id SERIAL PRIMARY KEY,
-                bbl VARCHAR(10) UNIQUE NOT NULL,
-                address TEXT,
-                borough VARCHAR(20),
-                block VARCHAR(20),
-                lot VARCHAR(20),
-                bin VARCHAR(50),
-                
-                -- PLUTO basics
-                building_class VARCHAR(10),
-                land_use VARCHAR(50),
-                residential_units INTEGER,
-                total_units INTEGER,
-                year_built INTEGER,
-                num_floors INTEGER,
-                building_sqft INTEGER,
-                lot_sqft INTEGER,
-                
-                -- Current owner
-                current_owner_name VARCHAR(500),
-                owner_mailing_address TEXT,
-                
-                -- Latest ownership transaction
-                purchase_date DATE,
-                purchase_price DECIMAL(15,2),
-                mortgage_amount DECIMAL(15,2),
-                
-                -- Current valuation
-                estimated_value DECIMAL(15,2),
-                value_source VARCHAR(50),
-                estimated_rent_per_unit DECIMAL(10,2),
-                estimated_annual_rent DECIMAL(15,2),
-                estimated_equity DECIMAL(15,2),
-                
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            -- bbl is UNIQUE, so buildings_bbl_key already indexes it
+            DROP INDEX IF EXISTS idx_buildings_bbl;
+            -- Owner search is ILIKE '%...%', which a B-tree can't serve;
+            -- replaced by the trigram indexes built below
+            DROP INDEX IF EXISTS idx_buildings_owner;
+            CREATE INDEX IF NOT EXISTS idx_buildings_borough ON buildings(borough);
         """)
         
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_buildings_bbl ON buildings(bbl)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_buildings_owner ON buildings(current_owner_name)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_buildings_borough ON buildings(borough)")
-        
-        conn.commit()
-        print("   ✓ Buildings table created")
-    except Exception as e:
-        print(f"   ✗ Error: {e}")
-        conn.rollback()
-    
-    # 2. Owner contacts table
-    print("\n2. Creating owner_contacts table...")
-    try:
+        # 2. Owner contacts table
+        print("\n2. Creating owner_contacts table...")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS owner_contacts (
                 id SERIAL PRIMARY KEY,
-                owner_name VARCHAR(500),
+                owner_name TEXT,
                 
-                phone VARCHAR(50),
-                phone_type VARCHAR(20),
-                email VARCHAR(255),
+                phone TEXT,
+                phone_type TEXT,
+                email TEXT,
                 
                 is_verified BOOLEAN DEFAULT FALSE,
-                confidence VARCHAR(20),
-                source VARCHAR(100),
+                confidence TEXT,
+                source TEXT,
                 
                 last_verified TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            );
+            CREATE INDEX IF NOT EXISTS idx_owner_contacts_name ON owner_contacts(owner_name);
+            CREATE INDEX IF NOT EXISTS idx_owner_contacts_phone ON owner_contacts(phone);
         """)
         
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_owner_contacts_name ON owner_contacts(owner_name)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_owner_contacts_phone ON owner_contacts(phone)")
-        
-        conn.commit()
-        print("   ✓ Owner contacts table created")
-    except Exception as e:
-        print(f"   ✗ Error: {e}")
-        conn.rollback()
-    
-    # 3. Building metrics table
-    print("\n3. Creating building_metrics table...")
-    try:
+        # 3. Building metrics table
+        print("\n3. Creating building_metrics table...")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS building_metrics (
+                -- Declared 8-byte, 4-byte, then variable-length (no alignment padding)
                 id SERIAL PRIMARY KEY,
-                bbl VARCHAR(10) UNIQUE,
-                
-                -- Renovation spend
                 total_permits_3yr INTEGER DEFAULT 0,
-                total_spend_3yr DECIMAL(15,2) DEFAULT 0,
+                total_spend_3yr BIGINT DEFAULT 0,
+                last_calculated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_permit_date DATE,
-                major_work_types TEXT,
                 
                 -- Calculated scores (0-100)
                 affordability_score INTEGER,
@@ -125,66 +168,66 @@ def run_migration():
                 contact_quality_score INTEGER,
                 overall_priority_score INTEGER,
                 
-                priority_tier VARCHAR(20),
+                bbl TEXT UNIQUE,
+                major_work_types TEXT,
+                priority_tier TEXT,
                 target_summary TEXT,
                 
-                last_calculated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (bbl) REFERENCES buildings(bbl) ON DELETE CASCADE
-            )
+            );
+            -- bbl is UNIQUE, so building_metrics_bbl_key already indexes it
+            DROP INDEX IF EXISTS idx_building_metrics_bbl;
+            CREATE INDEX IF NOT EXISTS idx_building_metrics_priority ON building_metrics(overall_priority_score DESC)
+                WHERE overall_priority_score IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_building_metrics_tier ON building_metrics(priority_tier);
         """)
         
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_building_metrics_bbl ON building_metrics(bbl)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_building_metrics_priority ON building_metrics(overall_priority_score DESC)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_building_metrics_tier ON building_metrics(priority_tier)")
+        # 4/5. Add BBL to permits and contacts
+        print("\n4. Adding BBL column to permits and contacts tables...")
+        cur.execute("ALTER TABLE permits ADD COLUMN IF NOT EXISTS bbl TEXT")
+        cur.execute("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS bbl TEXT")
         
         conn.commit()
-        print("   ✓ Building metrics table created")
+        print("   ✓ Tables and columns created")
     except Exception as e:
-        print(f"   ✗ Error: {e}")
         conn.rollback()
+        print(f"   ✗ Error: {e} (no changes applied)")
+        cur.close()
+        conn.close()
+        raise
     
-    # 4. Add BBL to permits table
-    print("\n4. Adding BBL column to permits table...")
-    try:
-        # Check if column exists
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='permits' AND column_name='bbl'
-        """)
-        
-        if not cur.fetchone():
-            cur.execute("ALTER TABLE permits ADD COLUMN bbl VARCHAR(10)")
-            cur.execute("CREATE INDEX idx_permits_bbl ON permits(bbl)")
-            print("   ✓ Added bbl column to permits")
-        else:
-            print("   ✓ BBL column already exists")
-        
-        conn.commit()
-    except Exception as e:
-        print(f"   ✗ Error: {e}")
-        conn.rollback()
+    # 5. Index the new bbl columns without blocking writes to permits/contacts
+    print("\n5. Indexing BBL columns...")
+    for table in ['permits', 'contacts']:
+        try:
+            create_index_concurrently(conn, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_bbl ON {table}(bbl) WHERE bbl IS NOT NULL")
+            print(f"   ✓ BBL index on {table}")
+        except Exception as e:
+            print(f"   ✗ Error: {e}")
     
-    # 5. Add BBL to contacts table
-    print("\n5. Adding BBL column to contacts table...")
+    # 6. Trigram indexes for the dashboard's owner search
+    # (current_owner_name ILIKE %s OR owner_name_rpad ILIKE %s OR owner_name_hpd ILIKE %s
+    # becomes a BitmapOr of the three instead of a full scan of buildings)
+    # pg_trgm is optional: if the server doesn't have it or the role can't
+    # create extensions, skip these indexes rather than fail the migration
+    print("\n6. Indexing owner names for search...")
+    conn.autocommit = True
     try:
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name='contacts' AND column_name='bbl'
-        """)
-        
-        if not cur.fetchone():
-            cur.execute("ALTER TABLE contacts ADD COLUMN bbl VARCHAR(10)")
-            cur.execute("CREATE INDEX idx_contacts_bbl ON contacts(bbl)")
-            print("   ✓ Added bbl column to contacts")
-        else:
-            print("   ✓ BBL column already exists")
-        
-        conn.commit()
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        has_trgm = True
     except Exception as e:
-        print(f"   ✗ Error: {e}")
-        conn.rollback()
+        has_trgm = False
+        print(f"   ✗ pg_trgm unavailable, skipping trigram indexes: {e}")
+    finally:
+        conn.autocommit = False
+    
+    if has_trgm:
+        for column in ['current_owner_name', 'owner_name_rpad', 'owner_name_hpd']:
+            try:
+                create_index_concurrently(conn, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_buildings_{column}_trgm ON buildings USING GIN ({column} gin_trgm_ops)")
+                print(f"   ✓ Trigram index on buildings.{column}")
+            except Exception as e:
+                print(f"   ✗ Error: {e}")
     
     cur.close()
     conn.close()
@@ -164,7 +164,8 @@ def run_migration():
     indexes = [
         ("idx_permits_bbl", "CREATE INDEX IF NOT EXISTS idx_permits_bbl ON permits(bbl)"),
         ("idx_permits_block_lot", "CREATE INDEX IF NOT EXISTS idx_permits_block_lot ON permits(block, lot)"),
-        ("idx_buildings_bbl", "CREATE INDEX IF NOT EXISTS idx_buildings_bbl ON buildings(bbl)"),
+        # buildings.bbl is UNIQUE - its constraint index already covers lookups
+        ("idx_buildings_bbl", "DROP INDEX IF EXISTS idx_buildings_bbl"),
         ("idx_owner_contacts_building_id", "CREATE INDEX IF NOT EXISTS idx_owner_contacts_building_id ON owner_contacts(building_id)"),
         ("idx_building_metrics_building_id", "CREATE INDEX IF NOT EXISTS idx_building_metrics_building_id ON building_metrics(building_id)")
     ]
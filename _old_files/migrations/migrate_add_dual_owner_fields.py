@@ -60,8 +60,8 @@ def migrate():
         print("\n3️⃣  Adding assessment value fields...")
         cur.execute("""
             ALTER TABLE buildings 
-            ADD COLUMN IF NOT EXISTS assessed_land_value NUMERIC(15, 2),
-            ADD COLUMN IF NOT EXISTS assessed_total_value NUMERIC(15, 2)
+            ADD COLUMN IF NOT EXISTS assessed_land_value BIGINT,
+            ADD COLUMN IF NOT EXISTS assessed_total_value BIGINT
         """)
         print("   ✅ Added assessed_land_value")
         print("   ✅ Added assessed_total_value")
@@ -56,20 +56,21 @@ def migrate():
     
     # Check if columns already exist
     cur.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'buildings' 
-        AND column_name IN (
-            'owner_name_hpd',
-            'hpd_registration_id',
-            'hpd_open_violations',
-            'hpd_total_violations',
-            'hpd_open_complaints',
-            'hpd_total_complaints'
-        )
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = 'buildings'::regclass AND attnum > 0 AND NOT attisdropped
     """)
     
-    existing_columns = [row[0] for row in cur.fetchall()]
+    hpd_columns = [
+        'owner_name_hpd',
+        'hpd_registration_id',
+        'hpd_open_violations',
+        'hpd_total_violations',
+        'hpd_open_complaints',
+        'hpd_total_complaints'
+    ]
+    all_columns = {row[0] for row in cur.fetchall()}
+    existing_columns = [col for col in hpd_columns if col in all_columns]
     
     if existing_columns:
         print(f"⚠️  Some HPD columns already exist: {', '.join(existing_columns)}")
@@ -83,8 +84,8 @@ def migrate():
     # Add HPD owner field (complements current_owner_name and owner_name_rpad)
     cur.execute("""
         ALTER TABLE buildings
-        ADD COLUMN IF NOT EXISTS owner_name_hpd VARCHAR(500),
-        ADD COLUMN IF NOT EXISTS hpd_registration_id VARCHAR(50),
+        ADD COLUMN IF NOT EXISTS owner_name_hpd TEXT,
+        ADD COLUMN IF NOT EXISTS hpd_registration_id TEXT,
         ADD COLUMN IF NOT EXISTS hpd_open_violations INTEGER DEFAULT 0,
         ADD COLUMN IF NOT EXISTS hpd_total_violations INTEGER DEFAULT 0,
         ADD COLUMN IF NOT EXISTS hpd_open_complaints INTEGER DEFAULT 0,
@@ -94,8 +95,8 @@ def migrate():
     conn.commit()
     
     print("✅ Successfully added HPD columns:")
-    print("   - owner_name_hpd (VARCHAR 500)")
-    print("   - hpd_registration_id (VARCHAR 50)")
+    print("   - owner_name_hpd (TEXT)")
+    print("   - hpd_registration_id (TEXT)")
     print("   - hpd_open_violations (INTEGER)")
     print("   - hpd_total_violations (INTEGER)")
     print("   - hpd_open_complaints (INTEGER)")
@@ -104,11 +105,11 @@ def migrate():
     
     # Verify the columns were added
     cur.execute("""
-        SELECT column_name, data_type 
-        FROM information_schema.columns 
-        WHERE table_name = 'buildings' 
-        AND column_name LIKE 'hpd_%' OR column_name = 'owner_name_hpd'
-        ORDER BY column_name
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'buildings'::regclass AND attnum > 0 AND NOT attisdropped
+        AND (attname LIKE 'hpd\\_%' OR attname = 'owner_name_hpd')
+        ORDER BY attname
     """)
     
     new_columns = cur.fetchall()
@@ -17,6 +17,9 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME')
 }
 
+# Statements sent per round-trip when streaming the data file
+STATEMENT_BATCH_SIZE = 100
+
 def import_sql_file(cursor, filepath):
     """Import a SQL file"""
     print(f"Importing {filepath}...")
@@ -32,6 +35,49 @@ def import_sql_file(cursor, filepath):
         print(f"❌ Error importing {filepath}: {e}")
         return False
 
+def iter_sql_statements(f):
+    """
+    Yield statements from a SQL dump one at a time without reading the whole
+    file. A statement ends at a line ending in ';' outside a quoted string
+    (quote count even - escaped '' quotes keep the parity).
+    """
+    lines = []
+    quotes = 0
+    for line in f:
+        if not lines and (not line.strip() or line.startswith('--')):
+            continue
+        lines.append(line)
+        quotes += line.count("'")
+        if quotes % 2 == 0 and line.rstrip().endswith(';'):
+            yield ''.join(lines)
+            lines = []
+            quotes = 0
+    if lines and ''.join(lines).strip():
+        yield ''.join(lines)
+
+
+def import_sql_statements(cursor, filepath):
+    """Stream a SQL file of INSERT statements, executing STATEMENT_BATCH_SIZE at a time"""
+    print(f"Importing {filepath}...")
+    count = 0
+    batch = []
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for statement in iter_sql_statements(f):
+                batch.append(statement)
+                if len(batch) >= STATEMENT_BATCH_SIZE:
+                    cursor.execute(''.join(batch))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.execute(''.join(batch))
+                count += len(batch)
+        print(f"✅ Successfully imported {filepath} ({count:,} statements)")
+        return True
+    except Exception as e:
+        print(f"❌ Error importing {filepath} after {count:,} statements: {e}")
+        return False
+
 def main():
     print("=" * 60)
     print("Railway PostgreSQL Database Import")
@@ -80,7 +126,7 @@ def main():
     data_file = os.path.join(current_dir, 'postgres_data.sql')
     print("Step 2: Importing data (2,025 rows)...")
     print("This may take a minute...")
-    if import_sql_file(cursor, data_file):
+    if import_sql_statements(cursor, data_file):
         conn.commit()
         print("✅ Data imported and committed")
     else:
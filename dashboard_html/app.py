@@ -33,6 +33,8 @@ from auth_routes import auth_bp
 from auth_service import login_required, validate_session
 app.register_blueprint(auth_bp)
 
+from sql_templates import PERMIT_CONTACT_COLUMNS
+
 # Simple in-memory cache (can upgrade to Redis later)
 cache = Cache(app, config={
     'CACHE_TYPE': 'SimpleCache',  # In-memory cache
@@ -231,27 +233,9 @@ def get_permits():
     try:
         with DatabaseConnection() as cur:
             # Query with contact information from permits table and building intelligence
-            query = """
+            query = f"""
                 SELECT 
-                    p.*,
-                    -- Calculate contact count from permits table columns
-                    (
-                        CASE WHEN p.permittee_phone IS NOT NULL AND p.permittee_phone != '' THEN 1 ELSE 0 END +
-                        CASE WHEN p.owner_phone IS NOT NULL AND p.owner_phone != '' THEN 1 ELSE 0 END
-                    ) as contact_count,
-                    false as has_mobile,
-                    -- Aggregate contact names
-                    CONCAT_WS(' | ',
-                        NULLIF(COALESCE(p.permittee_business_name, p.applicant), ''),
-                        NULLIF(p.owner_business_name, ''),
-                        NULLIF(p.superintendent_business_name, ''),
-                        NULLIF(p.site_safety_mgr_business_name, '')
-                    ) as contact_names,
-                    -- Aggregate contact phones
-                    CONCAT_WS(' | ',
-                        NULLIF(p.permittee_phone, ''),
-                        NULLIF(p.owner_phone, '')
-                    ) as contact_phones,
+                    p.*,{PERMIT_CONTACT_COLUMNS},
                     b.id as building_id,
                     b.current_owner_name,
                     b.owner_name_rpad,
@@ -1219,27 +1203,9 @@ def get_permit_detail(permit_id):
     try:
         with DatabaseConnection() as cur:
             # Get permit with all details including contact info from permits table
-            query = """
+            query = f"""
             SELECT 
-                p.*,
-                -- Calculate contact count from permits table columns
-                (
-                    CASE WHEN p.permittee_phone IS NOT NULL AND p.permittee_phone != '' THEN 1 ELSE 0 END +
-                    CASE WHEN p.owner_phone IS NOT NULL AND p.owner_phone != '' THEN 1 ELSE 0 END
-                ) as contact_count,
-                false as has_mobile,
-                -- Aggregate contact names
-                CONCAT_WS(' | ',
-                    NULLIF(COALESCE(p.permittee_business_name, p.applicant), ''),
-                    NULLIF(p.owner_business_name, ''),
-                    NULLIF(p.superintendent_business_name, ''),
-                    NULLIF(p.site_safety_mgr_business_name, '')
-                ) as contact_names,
-                -- Aggregate contact phones
-                CONCAT_WS(' | ',
-                    NULLIF(p.permittee_phone, ''),
-                    NULLIF(p.owner_phone, '')
-                ) as contact_phones
+                p.*,{PERMIT_CONTACT_COLUMNS}
             FROM permits p
             WHERE p.id = %s;
             """
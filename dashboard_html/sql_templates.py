@@ -0,0 +1,54 @@
+"""
+SQL Fragments for Permit Contact Aggregation
+Contact info lives directly on the permits table (permittee/owner/superintendent/
+site safety columns). These fragments are built once at import time so every
+endpoint aggregates contacts the same way.
+"""
+
+# Contact name expressions, in display order
+PERMIT_CONTACT_NAME_COLUMNS = (
+    "COALESCE({alias}.permittee_business_name, {alias}.applicant)",
+    "{alias}.owner_business_name",
+    "{alias}.superintendent_business_name",
+    "{alias}.site_safety_mgr_business_name",
+)
+
+# Phone columns that count as contacts
+PERMIT_CONTACT_PHONE_COLUMNS = (
+    "permittee_phone",
+    "owner_phone",
+)
+
+
+def permit_contact_columns(alias='p'):
+    """
+    SELECT-list fragment producing contact_count, has_mobile, contact_names
+    and contact_phones for a permits row aliased as `alias`.
+    """
+    contact_count = " +\n        ".join(
+        f"CASE WHEN {alias}.{col} IS NOT NULL AND {alias}.{col} != '' THEN 1 ELSE 0 END"
+        for col in PERMIT_CONTACT_PHONE_COLUMNS
+    )
+    contact_names = ",\n        ".join(
+        f"NULLIF({expr.format(alias=alias)}, '')" for expr in PERMIT_CONTACT_NAME_COLUMNS
+    )
+    contact_phones = ",\n        ".join(
+        f"NULLIF({alias}.{col}, '')" for col in PERMIT_CONTACT_PHONE_COLUMNS
+    )
+    return f"""
+    -- Calculate contact count from permits table columns
+    (
+        {contact_count}
+    ) as contact_count,
+    false as has_mobile,
+    -- Aggregate contact names
+    CONCAT_WS(' | ',
+        {contact_names}
+    ) as contact_names,
+    -- Aggregate contact phones
+    CONCAT_WS(' | ',
+        {contact_phones}
+    ) as contact_phones"""
+
+
+PERMIT_CONTACT_COLUMNS = permit_contact_columns()
@@ -0,0 +1,60 @@
+"""
+Shared database connection settings for the migration scripts.
+
+.env is loaded and the connection parameters are resolved once, at import:
+    from db import CONN_KWARGS
+    conn = psycopg2.connect(**CONN_KWARGS)
+
+DATABASE_URL wins if set; otherwise each parameter falls back from the
+libpq-style PG* name to the DB_* name used elsewhere in this repo.
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+load_dotenv('dashboard_html/.env')  # never overrides values already set
+
+
+def _env(*names, default=None):
+    """First non-empty environment variable out of `names`"""
+    for name in names:
+        value = os.getenv(name)
+        if value:
+            return value
+    return default
+
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+if DATABASE_URL:
+    CONN_KWARGS = {'dsn': DATABASE_URL}
+else:
+    CONN_KWARGS = {
+        'host': _env('PGHOST', 'DB_HOST', default='localhost'),
+        'port': _env('PGPORT', 'DB_PORT', default='5432'),
+        'dbname': _env('PGDATABASE', 'DB_NAME'),
+        'user': _env('PGUSER', 'DB_USER'),
+        'password': _env('PGPASSWORD', 'DB_PASSWORD'),
+    }
+
+# Schema-only migrations: a COMMIT lost in a server crash just means the
+# (idempotent) migration gets re-run, so skip waiting on the WAL flush.
+DDL_CONN_KWARGS = {**CONN_KWARGS, 'options': '-c synchronous_commit=off'}
+
+
+def migration_applied(cur, name):
+    """True if migration `name` is recorded in schema_migrations (creates the table on first use)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+    return cur.fetchone() is not None
+
+
+def record_migration(cur, name):
+    """Mark migration `name` as applied; the caller commits"""
+    cur.execute("INSERT INTO schema_migrations (name) VALUES (%s) ON CONFLICT DO NOTHING", (name,))
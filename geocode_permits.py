@@ -17,18 +17,37 @@ https://developer.cityofnewyork.us/user/register
 import os
 import sys
 import time
+import argparse
+import asyncio
+import logging
 import re
-import requests
+import random
+import orjson
+import httpx
 from dotenv import load_dotenv
 import psycopg2
 import psycopg2.extras
 
+from db import migration_applied, record_migration
+
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 # Configuration - Optimized for NYC Geoclient V2 User
 # V2 Limits: 100 calls/sec, 2,500 calls/min, 500,000 calls/day
 BATCH_SIZE = int(os.getenv('GEOCODE_BATCH_SIZE', '500'))  # Process 500 permits per run
-RATE_LIMIT_DELAY = float(os.getenv('GEOCODE_DELAY', '0.01'))  # 0.01s = 100 requests/sec
+RATE_LIMIT_DELAY = float(os.getenv('GEOCODE_DELAY', '0.0105'))  # ~95 requests/sec, just under the 100/sec cap
+NOMINATIM_DELAY = float(os.getenv('NOMINATIM_DELAY', '1.1'))  # OSM policy: max 1 request/sec, with margin
+NUM_WORKERS = int(os.getenv('GEOCODE_WORKERS', '16'))  # Concurrent in-flight API requests
+MAX_RETRIES = 5  # Retries on 429/5xx/network errors before giving up on an address
+MAX_BACKOFF = 30  # Cap (seconds) for a single retry wait
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+FETCH_ITERSIZE = int(os.getenv('GEOCODE_CHUNK_SIZE', '100'))  # Permits streamed, geocoded and saved per chunk
+UPDATE_CHUNK_SIZE = 200  # Rows per UPDATE statement / commit
+NEGATIVE_CACHE_DAYS = int(os.getenv('GEOCODE_NEGATIVE_CACHE_DAYS', '7'))  # Skip the APIs for a known-bad address this long
+DEBUG = os.getenv('GEOCODE_DEBUG', '').lower() in ('1', 'true', 'yes')  # Print query plans
+METRICS_PORT = os.getenv('GEOCODE_METRICS_PORT')  # Expose Prometheus counters when set
 
 # Database configuration
 DB_HOST = os.getenv('DB_HOST')
@@ -58,6 +77,99 @@ else:
     print(f"✅ NYC Geoclient API configured")
 
 
+# Prometheus counters - only created when GEOCODE_METRICS_PORT is set
+GEOCODE_SUCCESS = None
+GEOCODE_FAIL = None
+
+
+def start_metrics_server():
+    """Serve geocoding throughput counters so dashboards don't need DB COUNTs"""
+    global GEOCODE_SUCCESS, GEOCODE_FAIL
+    if not METRICS_PORT:
+        return
+    try:
+        from prometheus_client import Counter, start_http_server
+    except ImportError:
+        print("⚠️  GEOCODE_METRICS_PORT set but prometheus_client is not installed - metrics disabled")
+        return
+    GEOCODE_SUCCESS = Counter('geocode_success_total', 'Addresses geocoded successfully', ['source'])
+    GEOCODE_FAIL = Counter('geocode_fail_total', 'Addresses that could not be geocoded')
+    start_http_server(int(METRICS_PORT))
+    print(f"📈 Prometheus metrics on :{METRICS_PORT}/metrics")
+
+
+class AsyncRateLimiter:
+    """
+    Space request starts `interval` seconds apart across all tasks.
+    Tasks waiting on one API don't block requests to the other.
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def __aenter__(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+# Shared connection pool - workers reuse keep-alive TLS connections instead
+# of handshaking per request. Sized above NUM_WORKERS so no task waits on the pool.
+HTTP_LIMITS = httpx.Limits(
+    max_connections=max(32, NUM_WORKERS * 2),
+    max_keepalive_connections=max(32, NUM_WORKERS * 2),
+    keepalive_expiry=60,
+)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+
+def make_http_client():
+    """Async HTTP client backed by the shared keep-alive pool"""
+    return httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+# Global rate limits - NYC Geoclient V2 allows 100/sec, Nominatim 1/sec.
+# Separate limiters so waiting on the Nominatim cooldown never stalls Geoclient.
+GEOCLIENT_LIMITER = AsyncRateLimiter(RATE_LIMIT_DELAY)
+NOMINATIM_LIMITER = AsyncRateLimiter(NOMINATIM_DELAY)
+
+
+def retry_delay(attempt, retry_after=''):
+    """Seconds to wait before retry `attempt`: Retry-After if given, else exponential backoff with jitter"""
+    if retry_after.isdigit():
+        return min(MAX_BACKOFF, float(retry_after))
+    return min(MAX_BACKOFF, 2 ** attempt + random.random())
+
+
+async def get_with_retry(client, limiter, url, params, headers):
+    """
+    GET through the given rate limiter, retrying 429/5xx and network errors
+    (timeouts, dropped connections) so a transient outage doesn't get an
+    address flagged geocode_failed. Hard 4xx responses return immediately.
+    Returns the last response, or raises the last network error.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with limiter:
+                response = await client.get(url, params=params, headers=headers)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+            continue
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(retry_delay(attempt, response.headers.get('Retry-After', '')))
+
+
 def get_db_connection():
     """Create database connection"""
     return psycopg2.connect(
@@ -65,9 +177,149 @@ def get_db_connection():
         port=int(DB_PORT),
         user=DB_USER,
         password=DB_PASSWORD,
-        database=DB_NAME,
-        cursor_factory=psycopg2.extras.RealDictCursor
+        database=DB_NAME
+    )
+
+
+# Address key: whitespace collapsed, upper case. Same expression as the
+# permits.address_normalized generated column (migrate_add_address_normalized.py),
+# used inline when the column hasn't been added yet.
+ADDRESS_NORMALIZED_SQL = r"upper(btrim(regexp_replace(address, '\s+', ' ', 'g')))"
+
+
+def address_key_column(cur):
+    """permits.address_normalized if the migration has run, else the inline expression"""
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'permits' AND column_name = 'address_normalized'
+    """)
+    return 'address_normalized' if cur.fetchone() else ADDRESS_NORMALIZED_SQL
+
+
+# Permits still waiting for coordinates - prioritize permits with BBL
+# (can use NYC Geoclient V2) and skip permits that have already failed.
+# Keep the WHERE and ORDER BY in sync with idx_permits_to_geocode.
+CANDIDATES_QUERY = """
+    SELECT id, {address_key}, bbl
+    FROM permits 
+    WHERE (latitude IS NULL OR longitude IS NULL)
+        AND address IS NOT NULL 
+        AND address != ''
+        AND (geocode_failed IS NULL OR geocode_failed = FALSE)
+    ORDER BY 
+        CASE WHEN bbl IS NOT NULL AND bbl <> '' THEN 0 ELSE 1 END,
+        id
+    LIMIT %s
+"""
+
+
+def fetch_statistics(cur, fast_stats=False):
+    """
+    Return (total_permits, with_coords, estimated).
+    Exact mode scans permits once with conditional aggregation; fast mode reads
+    planner estimates from pg_class (permits table + idx_permits_ungeocoded)
+    and falls back to exact counts if the estimates are not available yet.
+    """
+    if fast_stats:
+        cur.execute("""
+            SELECT
+                (SELECT reltuples::bigint FROM pg_class WHERE oid = 'permits'::regclass) AS total,
+                (SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('idx_permits_ungeocoded')) AS without_coords
+        """)
+        total, without_coords = cur.fetchone()
+        # reltuples is -1 (or the index is missing) until the table has been analyzed
+        if total is not None and total > 0 and without_coords is not None and without_coords >= 0:
+            return total, max(total - without_coords, 0), True
+    
+    cur.execute("""
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE latitude IS NOT NULL AND longitude IS NOT NULL) AS with_coords
+        FROM permits
+    """)
+    total, with_coords = cur.fetchone()
+    return total, with_coords, False
+
+
+# Partial indexes that only hold the backlog, so lookups stay cheap even when
+# nearly every permit already has coordinates.
+#   idx_permits_ungeocoded         - every permit missing coordinates (fast stats)
+#   idx_permits_to_geocode         - CANDIDATES_QUERY's predicate and ORDER BY, so
+#                                    the batch is read in index order without a sort
+GEOCODE_INDEXES = {
+    'idx_permits_ungeocoded': """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_permits_ungeocoded
+        ON permits (id)
+        WHERE (latitude IS NULL OR longitude IS NULL)
+            AND address IS NOT NULL
+            AND address <> ''
+    """,
+    'idx_permits_to_geocode': """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_permits_to_geocode
+        ON permits ((CASE WHEN bbl IS NOT NULL AND bbl <> '' THEN 0 ELSE 1 END), id)
+        WHERE (latitude IS NULL OR longitude IS NULL)
+            AND address IS NOT NULL
+            AND address <> ''
+            AND (geocode_failed IS NULL OR geocode_failed = FALSE)
+    """,
+}
+
+# Earlier index definitions replaced by GEOCODE_INDEXES
+SUPERSEDED_GEOCODE_INDEXES = ['idx_permits_geocode_candidates']
+
+
+def ensure_geocode_index(conn):
+    """Create any missing GEOCODE_INDEXES and drop superseded ones"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    conn.commit()
+    conn.autocommit = True
+    try:
+        cur = conn.cursor()
+        for name, ddl in GEOCODE_INDEXES.items():
+            try:
+                cur.execute(ddl)
+            except Exception as e:
+                print(f"⚠️  Could not create {name}: {e}")
+        for name in SUPERSEDED_GEOCODE_INDEXES:
+            try:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            except Exception as e:
+                print(f"⚠️  Could not drop {name}: {e}")
+        cur.close()
+    finally:
+        conn.autocommit = False
+
+
+# Nominatim viewbox covering the five boroughs (lon1,lat1,lon2,lat2)
+NYC_VIEWBOX = '-74.26,40.91,-73.69,40.49'
+
+# BBL borough digit → borough name (bbl is a text column, so index it directly)
+BOROUGH_MAP = {
+    '1': 'Manhattan',
+    '2': 'Bronx',
+    '3': 'Brooklyn',
+    '4': 'Queens',
+    '5': 'Staten Island'
+}
+
+# Address parsing / cleanup patterns - compiled once, used for every permit
+HOUSE_NUMBER_RE = re.compile(r'^(\d+[\w-]*)\s+(.+)$')
+TRAILING_BOROUGH_RE = re.compile(r',?\s*\b(MANHATTAN|BROOKLYN|QUEENS|BRONX|STATEN ISLAND)$')
+ORDINAL_RE = re.compile(r'(\d+)(?:[T][hH]|[N][dD]|[R][dD]|[S][tT])\b')
+BARE_NUMBER_STREET_RE = re.compile(r'(\d+)\s+(Street|Avenue|Place|Road)\b')
+STREET_ABBREVIATIONS = [
+    (re.compile(pattern), replacement) for pattern, replacement in (
+        (r'\bSt\b\.?', 'Street'),
+        (r'\bAve\b\.?', 'Avenue'),
+        (r'\bRd\b\.?', 'Road'),
+        (r'\bBlvd\b\.?', 'Boulevard'),
+        (r'\bPl\b\.?', 'Place'),
+        (r'\bDr\b\.?', 'Drive'),
+        (r'\bCt\b\.?', 'Court'),
+        (r'\bLn\b\.?', 'Lane'),
+        (r'\bPkwy\b\.?', 'Parkway'),
     )
+]
 
 
 def parse_nyc_address(address):
@@ -82,26 +334,31 @@ def parse_nyc_address(address):
     address = ' '.join(address.split()).strip().upper()
     
     # Try to extract house number and street
-    match = re.match(r'^(\d+[\w-]*)\s+(.+)$', address)
+    match = HOUSE_NUMBER_RE.match(address)
     if not match:
         return None, None, None
     
     house_number = match.group(1)
     street_name = match.group(2).strip()
     
-    # Extract borough if present (usually at the end)
+    # Extract borough if present (at the end)
     # Common patterns: "STREET, BOROUGH" or "STREET BOROUGH"
     borough = None
-    for boro in ['MANHATTAN', 'BROOKLYN', 'QUEENS', 'BRONX', 'STATEN ISLAND']:
-        if boro in street_name:
-            borough = boro
-            street_name = street_name.replace(f', {boro}', '').replace(boro, '').strip()
-            break
+    match = TRAILING_BOROUGH_RE.search(street_name)
+    if match and match.start() > 0:
+        borough, street_name = match.group(1), street_name[:match.start()].rstrip(', ')
     
     return house_number, street_name, borough
 
 
-def geocode_with_nyc_geoclient(address, borough=None):
+def ordinal(num):
+    """'141' → '141st', '22' → '22nd', '11' → '11th'"""
+    if num[-2:] in ('11', '12', '13'):
+        return f"{num}th"
+    return num + {'1': 'st', '2': 'nd', '3': 'rd'}.get(num[-1], 'th')
+
+
+async def geocode_with_nyc_geoclient(client, address, borough=None):
     """
     Geocode an address using NYC Geoclient API V2.
     V2 API requires either borough or zip code.
@@ -133,14 +390,14 @@ def geocode_with_nyc_geoclient(address, borough=None):
     }
     
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = await get_with_retry(client, GEOCLIENT_LIMITER, url, params, headers)
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # V2 API returns data in 'address' object
-            if 'address' in data:
-                addr_data = data['address']
+            addr_data = data.get('address')
+            if addr_data:
                 # Get coordinates - V2 uses different field names
                 lat = addr_data.get('latitude')
                 lon = addr_data.get('longitude')
@@ -150,7 +407,7 @@ def geocode_with_nyc_geoclient(address, borough=None):
         else:
             # Debug: show what went wrong
             try:
-                error_data = response.json()
+                error_data = orjson.loads(response.content)
                 print(f"⚠️ NYC Geoclient status {response.status_code}: {error_data.get('message', 'Unknown error')[:80]}")
             except:
                 print(f"⚠️ NYC Geoclient returned status {response.status_code}")
@@ -161,81 +418,33 @@ def geocode_with_nyc_geoclient(address, borough=None):
     return None, None
 
 
-def geocode_with_nominatim(address):
+async def geocode_with_nominatim(client, address, borough=None):
     """
     Fallback geocoding using OpenStreetMap Nominatim (free, no API key)
     Returns: (latitude, longitude) or (None, None)
     """
     try:
-        import re
+        # Split off house number / borough so we can send a structured query
+        house_number, street_name, parsed_borough = parse_nyc_address(address)
         
         # Clean up address and convert to proper case for better results
-        clean_address = ' '.join(address.split())  # Remove extra whitespace
+        if house_number:
+            clean_address = f"{house_number} {street_name}"
+        else:
+            clean_address = ' '.join(address.split())  # Remove extra whitespace
         
         # Convert to title case for better OSM matching
         clean_address = clean_address.title()
         
-        # Fix ordinal numbers (141TH → 141st, 22ND → 22nd, etc.)
-        def fix_ordinals(match):
-            num = match.group(1)
-            suffix = match.group(2).lower() if match.group(2) else ''
-            
-            # Determine correct suffix based on number
-            last_digit = num[-1]
-            last_two = num[-2:] if len(num) >= 2 else num
-            
-            if last_two in ['11', '12', '13']:
-                correct_suffix = 'th'
-            elif last_digit == '1':
-                correct_suffix = 'st'
-            elif last_digit == '2':
-                correct_suffix = 'nd'
-            elif last_digit == '3':
-                correct_suffix = 'rd'
-            else:
-                correct_suffix = 'th'
-            
-            return f"{num}{correct_suffix}"
-        
-        # Fix explicit ordinals (141TH, 22ND, etc.)
-        clean_address = re.sub(r'(\d+)(?:[T][hH]|[N][dD]|[R][dD]|[S][tT])\b', fix_ordinals, clean_address)
+        # Fix explicit ordinals (141TH → 141st, 22ND → 22nd, etc.)
+        clean_address = ORDINAL_RE.sub(lambda m: ordinal(m.group(1)), clean_address)
         
         # Fix bare numbers before Street/Avenue/Place (e.g., "5 Street" → "5th Street")
-        def fix_bare_number_street(match):
-            num = match.group(1)
-            street_type = match.group(2)
-            # Determine correct suffix
-            last_digit = num[-1]
-            last_two = num[-2:] if len(num) >= 2 else num
-            if last_two in ['11', '12', '13']:
-                suffix = 'th'
-            elif last_digit == '1':
-                suffix = 'st'
-            elif last_digit == '2':
-                suffix = 'nd'
-            elif last_digit == '3':
-                suffix = 'rd'
-            else:
-                suffix = 'th'
-            return f"{num}{suffix} {street_type}"
-        
-        clean_address = re.sub(r'(\d+)\s+(Street|Avenue|Place|Road)\b', fix_bare_number_street, clean_address)
+        clean_address = BARE_NUMBER_STREET_RE.sub(lambda m: f"{ordinal(m.group(1))} {m.group(2)}", clean_address)
         
         # Fix common street abbreviations
-        replacements = {
-            r'\bSt\b\.?': 'Street',
-            r'\bAve\b\.?': 'Avenue',
-            r'\bRd\b\.?': 'Road',
-            r'\bBlvd\b\.?': 'Boulevard',
-            r'\bPl\b\.?': 'Place',
-            r'\bDr\b\.?': 'Drive',
-            r'\bCt\b\.?': 'Court',
-            r'\bLn\b\.?': 'Lane',
-            r'\bPkwy\b\.?': 'Parkway'
-        }
-        
-        for pattern, replacement in replacements.items():
-            clean_address = re.sub(pattern, replacement, clean_address)
+        for pattern, replacement in STREET_ABBREVIATIONS:
+            clean_address = pattern.sub(replacement, clean_address)
         
         # Try with just NYC first (most likely to work)
         url = "https://nominatim.openstreetmap.org/search"
@@ -244,24 +453,25 @@ def geocode_with_nominatim(address):
         }
         
         params = {
-            'q': f"{clean_address}, New York, NY",
             'format': 'json',
             'limit': 1,
-            'countrycodes': 'us'
+            'countrycodes': 'us',
+            'viewbox': NYC_VIEWBOX,
+            'bounded': 1  # Only search inside the NYC bounding box
         }
+        if house_number:
+            # Structured query (house number + street) - fewer misses than free text
+            city = (borough or parsed_borough or 'New York').title()
+            params.update({'street': clean_address, 'city': city, 'state': 'NY', 'country': 'USA'})
+        else:
+            params['q'] = f"{clean_address}, New York, NY"
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = await get_with_retry(client, NOMINATIM_LIMITER, url, params, headers)
         
         if response.status_code == 200:
-            results = response.json()
-            if results and len(results) > 0:
-                result = results[0]
-                lat = float(result['lat'])
-                lon = float(result['lon'])
-                return lat, lon
-        
-        # Rate limit for Nominatim (1 request per second)
-        time.sleep(1)
+            results = orjson.loads(response.content)
+            if results:
+                return float(results[0]['lat']), float(results[0]['lon'])
         
         return None, None
         
@@ -270,31 +480,374 @@ def geocode_with_nominatim(address):
         return None, None
 
 
-def update_permit_coordinates(conn, permit_id, latitude, longitude):
-    """Update permit with geocoded coordinates"""
+# Street-type abbreviations folded together for geocode_cache keys
+CACHE_KEY_ABBREVIATIONS = {
+    'ST': 'STREET',
+    'AVE': 'AVENUE',
+    'RD': 'ROAD',
+    'BLVD': 'BOULEVARD',
+    'PL': 'PLACE',
+    'DR': 'DRIVE',
+    'CT': 'COURT',
+    'LN': 'LANE',
+    'PKWY': 'PARKWAY',
+}
+
+
+def geocode_cache_key(address_key, borough):
+    """
+    geocode_cache primary key: normalized address with street abbreviations
+    expanded, plus the BBL borough (the same street exists in several boroughs).
+    """
+    words = [CACHE_KEY_ABBREVIATIONS.get(w.rstrip('.'), w) for w in address_key.replace(',', ' ').split()]
+    return f"{' '.join(words)}|{borough or ''}"
+
+
+# SQL twin of geocode_cache_key() for the one-time seed; the abbreviation and
+# borough lists are passed in as arrays so both sides share one definition.
+CACHE_KEY_SQL = r"""
+    (
+        SELECT COALESCE(string_agg(COALESCE(a.full_word, w.word), ' ' ORDER BY w.n), '')
+        FROM regexp_split_to_table(btrim(replace({address_key}, ',', ' ')), '\s+')
+            WITH ORDINALITY AS w(word, n)
+        LEFT JOIN unnest(%(abbr)s::text[], %(full_word)s::text[]) AS a(abbr, full_word)
+            ON a.abbr = rtrim(w.word, '.')
+        WHERE w.word <> ''
+    ) || '|' || COALESCE(
+        (SELECT b.borough
+         FROM unnest(%(digit)s::text[], %(borough)s::text[]) AS b(digit, borough)
+         WHERE b.digit = left(bbl, 1)),
+        ''
+    )
+"""
+
+GEOCODE_CACHE_SEED = 'geocode_cache_seed'
+
+
+def ensure_geocode_cache(conn, address_key_sql):
+    """
+    Create the geocode_cache table if missing, and seed it once (tracked in
+    schema_migrations) from permits that already have coordinates so previous
+    geocodes count as hits. Rows with NULL coordinates are negative entries:
+    addresses both APIs failed on, retried only after NEGATIVE_CACHE_DAYS.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            normalized_address TEXT PRIMARY KEY,
+            latitude DOUBLE PRECISION,
+            longitude DOUBLE PRECISION,
+            source TEXT,
+            cached_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("""
+        ALTER TABLE geocode_cache
+            ADD COLUMN IF NOT EXISTS failed_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS attempt_count INTEGER DEFAULT 0
+    """)
+    seeded = migration_applied(cur, GEOCODE_CACHE_SEED)
+    conn.commit()
+    
+    if not seeded:
+        # One server-side INSERT ... SELECT: no permit rows travel to Python
+        print("🌱 Seeding geocode_cache from already-geocoded permits...")
+        cache_key_sql = CACHE_KEY_SQL.format(address_key=address_key_sql)
+        cur.execute(f"""
+            INSERT INTO geocode_cache (normalized_address, latitude, longitude, source)
+            SELECT DISTINCT ON (cache_key) cache_key, latitude, longitude, 'permits'
+            FROM (
+                SELECT {cache_key_sql} AS cache_key, latitude, longitude
+                FROM permits
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                    AND address IS NOT NULL AND address != ''
+            ) geocoded
+            ORDER BY cache_key
+            ON CONFLICT (normalized_address) DO NOTHING
+        """, {
+            'abbr': list(CACHE_KEY_ABBREVIATIONS),
+            'full_word': list(CACHE_KEY_ABBREVIATIONS.values()),
+            'digit': list(BOROUGH_MAP),
+            'borough': list(BOROUGH_MAP.values()),
+        })
+        seeded_rows = cur.rowcount
+        record_migration(cur, GEOCODE_CACHE_SEED)
+        conn.commit()
+        print(f"   Seeded {seeded_rows:,} addresses\n")
+    
+    cur.close()
+
+
+def load_geocode_cache(conn, permits):
+    """
+    Look up this batch's addresses in geocode_cache.
+    Returns {(address_key, borough): (latitude, longitude)} for the hits;
+    recent negative entries come back as (None, None).
+    """
+    keys = {geocode_cache_key(address_key, borough): (address_key, borough)
+            for _, address_key, borough in permits}
+    
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT normalized_address, latitude, longitude
+        FROM geocode_cache
+        WHERE normalized_address = ANY(%s)
+            AND (latitude IS NOT NULL OR failed_at > NOW() - make_interval(days => %s))
+    """, (list(keys), NEGATIVE_CACHE_DAYS))
+    cached = {keys[cache_key]: (lat, lon) for cache_key, lat, lon in cur.fetchall()}
+    cur.close()
+    conn.commit()
+    return cached
+
+
+def save_geocode_cache(conn, entries):
+    """
+    Store (normalized_address, latitude, longitude, source) rows in geocode_cache.
+    A successful geocode replaces an earlier negative entry.
+    """
+    if not entries:
+        return
     try:
         cur = conn.cursor()
-        cur.execute("""
-            UPDATE permits 
-            SET latitude = %s, longitude = %s
-            WHERE id = %s
-        """, (latitude, longitude, permit_id))
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO geocode_cache (normalized_address, latitude, longitude, source)
+            VALUES %s
+            ON CONFLICT (normalized_address) DO UPDATE
+            SET latitude = EXCLUDED.latitude,
+                longitude = EXCLUDED.longitude,
+                source = EXCLUDED.source,
+                cached_at = NOW(),
+                failed_at = NULL
+            WHERE geocode_cache.latitude IS NULL
+        """, entries, page_size=1000)
         conn.commit()
         cur.close()
-        return True
     except Exception as e:
-        print(f"  ❌ Database update error: {str(e)}")
+        print(f"  ⚠️  Could not update geocode_cache: {e}")
         conn.rollback()
-        return False
 
 
-def geocode_permits():
+def save_failed_geocodes(conn, cache_keys):
+    """Record negative geocode_cache entries for addresses both APIs failed on"""
+    if not cache_keys:
+        return
+    try:
+        cur = conn.cursor()
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO geocode_cache (normalized_address, failed_at, attempt_count)
+            VALUES %s
+            ON CONFLICT (normalized_address) DO UPDATE
+            SET failed_at = NOW(),
+                attempt_count = COALESCE(geocode_cache.attempt_count, 0) + 1
+            WHERE geocode_cache.latitude IS NULL
+        """, [(key,) for key in cache_keys], template="(%s, NOW(), 1)", page_size=1000)
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        print(f"  ⚠️  Could not update geocode_cache: {e}")
+        conn.rollback()
+
+
+async def geocode_address(client, address_key, borough):
+    """
+    Geocode one normalized address: NYC Geoclient first (needs borough),
+    then OpenStreetMap Nominatim.
+    Returns (latitude, longitude, source) - (None, None, None) if both failed.
+    """
+    lat, lon, source = None, None, None
+    if USE_GEOCLIENT and borough:
+        lat, lon = await geocode_with_nyc_geoclient(client, address_key, borough)
+        source = 'NYC Geoclient'
+    
+    if lat is None or lon is None:
+        lat, lon = await geocode_with_nominatim(client, address_key, borough)
+        source = 'Nominatim'
+    
+    if lat is None or lon is None:
+        if GEOCODE_FAIL is not None:
+            GEOCODE_FAIL.inc()
+        return None, None, None
+    
+    if GEOCODE_SUCCESS is not None:
+        GEOCODE_SUCCESS.labels(source=source).inc()
+    return lat, lon, source
+
+
+async def geocode_batch(client, permits, cached=None):
+    """
+    Geocode a batch of (permit_id, address_key, borough) tuples over `client`.
+    Identical (address, borough) pairs share a single API call, addresses in
+    `cached` skip the API entirely, and the rest are geocoded concurrently
+    (at most NUM_WORKERS in flight).
+    Returns {(address_key, borough): (latitude, longitude, source)}
+    """
+    cached = cached or {}
+    results = {}
+    unique_keys = []
+    for key in dict.fromkeys((address_key, borough) for _, address_key, borough in permits):
+        if key in cached:
+            results[key] = (*cached[key], 'cache')
+        else:
+            unique_keys.append(key)
+    print(f"📦 {len(permits)} permits → {len(results) + len(unique_keys)} unique addresses, "
+          f"{len(results)} cached, {len(unique_keys)} to geocode ({NUM_WORKERS} in flight)\n")
+    
+    results_from_cache = len(results)
+    start_time = time.time()
+    semaphore = asyncio.Semaphore(NUM_WORKERS)
+    
+    async def process(key):
+        async with semaphore:
+            results[key] = await geocode_address(client, *key)
+        
+        # Progress indicator every 50 addresses
+        done = len(results) - results_from_cache
+        if done % 50 == 0:
+            elapsed = time.time() - start_time
+            rate = done / elapsed if elapsed > 0 else 0
+            remaining = len(unique_keys) - done
+            eta = remaining / rate if rate > 0 else 0
+            print(f"⏱️  Progress: {done}/{len(unique_keys)} | {rate:.1f} addresses/sec | ETA: {eta/60:.1f} min")
+    
+    await asyncio.gather(*(process(key) for key in unique_keys))
+    
+    print()
+    return results
+
+
+def update_permit_coordinates(conn, updates):
+    """
+    Save geocoded coordinates for a batch of ([permit_ids], latitude, longitude).
+    Each chunk of UPDATE_CHUNK_SIZE addresses is one UPDATE ... FROM (VALUES ...)
+    statement and one commit.
+    Returns the number of permits saved.
+    """
+    saved = 0
+    cur = conn.cursor()
+    for start in range(0, len(updates), UPDATE_CHUNK_SIZE):
+        chunk = updates[start:start + UPDATE_CHUNK_SIZE]
+        try:
+            psycopg2.extras.execute_values(cur, """
+                UPDATE permits AS p
+                SET latitude = v.lat, longitude = v.lon
+                FROM (VALUES %s) AS v(ids, lat, lon)
+                WHERE p.id = ANY(v.ids)
+            """, chunk, template="(%s::int[], %s::float8, %s::float8)", page_size=UPDATE_CHUNK_SIZE)
+            conn.commit()
+            saved += sum(len(ids) for ids, _, _ in chunk)
+        except Exception as e:
+            print(f"  ❌ Database update error: {str(e)}")
+            conn.rollback()
+    cur.close()
+    return saved
+
+
+def mark_permits_failed(conn, permit_ids):
+    """Flag permits that could not be geocoded so we don't retry them"""
+    cur = conn.cursor()
+    for start in range(0, len(permit_ids), UPDATE_CHUNK_SIZE):
+        try:
+            cur.execute("UPDATE permits SET geocode_failed = TRUE WHERE id = ANY(%s)",
+                        (permit_ids[start:start + UPDATE_CHUNK_SIZE],))
+            conn.commit()
+        except Exception as e:
+            print(f"  ⚠️  Could not mark as failed: {e}")
+            conn.rollback()
+    cur.close()
+
+
+def fetch_candidate_chunk(stream_cur):
+    """Next FETCH_ITERSIZE candidates as (permit_id, address_key, borough) tuples"""
+    return [
+        (permit_id, address_key, BOROUGH_MAP.get(bbl[0]) if bbl else None)
+        for permit_id, address_key, bbl in stream_cur.fetchmany(FETCH_ITERSIZE)
+    ]
+
+
+def save_chunk_results(conn, permits, geocoded, first_index):
+    """
+    Report and persist one geocoded chunk: new geocodes and misses go to
+    geocode_cache, coordinates to permits, misses get geocode_failed.
+    Returns (success_count, fail_count)
+    """
+    save_geocode_cache(conn, [
+        (geocode_cache_key(*key), lat, lon, source)
+        for key, (lat, lon, source) in geocoded.items()
+        if lat is not None and lon is not None and source != 'cache'
+    ])
+    save_failed_geocodes(conn, [
+        geocode_cache_key(*key) for key, (lat, _, source) in geocoded.items()
+        if lat is None and source != 'cache'
+    ])
+    
+    updates = {}  # (address_key, borough) -> permit ids sharing that geocode
+    failed_ids = []
+    
+    # Per-permit detail only with LOG_LEVEL=DEBUG - one stdout write per permit adds up
+    for i, (permit_id, address_key, borough) in enumerate(permits, first_index):
+        key = (address_key, borough)
+        lat, lon, source = geocoded[key]
+        
+        if lat is not None and lon is not None:
+            log.debug("[%d] Permit #%s: %s (%s) ✅ %s: %.6f, %.6f", i, permit_id, address_key, borough, source, lat, lon)
+            updates.setdefault(key, []).append(permit_id)
+        else:
+            log.debug("[%d] Permit #%s: %s (%s) ❌ %s", i, permit_id, address_key, borough,
+                      'failed recently, skipped APIs' if source == 'cache' else 'could not geocode')
+            failed_ids.append(permit_id)
+    
+    # Write results back in bulk
+    geocoded_count = sum(len(ids) for ids in updates.values())
+    print(f"💾 Permits {first_index}-{first_index + len(permits) - 1}: saving {geocoded_count} coordinates "
+          f"({len(updates)} addresses) and {len(failed_ids)} failures...")
+    rows = [(ids, geocoded[key][0], geocoded[key][1]) for key, ids in updates.items()]
+    success_count = update_permit_coordinates(conn, rows)
+    if success_count < geocoded_count:
+        print(f"  ❌ Failed to update {geocoded_count - success_count} permits in database")
+    if failed_ids:
+        mark_permits_failed(conn, failed_ids)
+    print()
+    
+    return success_count, len(failed_ids) + geocoded_count - success_count
+
+
+async def geocode_stream(conn, stream_cur):
+    """
+    Geocode candidates chunk by chunk over one HTTP client. The next chunk is
+    fetched from the server-side cursor while the current one is geocoding,
+    and each chunk is saved before moving on.
+    Returns (processed, unique_addresses, cache_hits, success_count, fail_count)
+    """
+    processed = unique_addresses = cache_hits = success_count = fail_count = 0
+    permits = fetch_candidate_chunk(stream_cur)
+    
+    async with make_http_client() as client:
+        while permits:
+            cached = load_geocode_cache(conn, permits)
+            next_chunk = asyncio.create_task(asyncio.to_thread(fetch_candidate_chunk, stream_cur))
+            geocoded = await geocode_batch(client, permits, cached)
+            following = await next_chunk
+            
+            succeeded, failed = save_chunk_results(conn, permits, geocoded, processed + 1)
+            processed += len(permits)
+            unique_addresses += len(geocoded)
+            cache_hits += sum(1 for _, _, source in geocoded.values() if source == 'cache')
+            success_count += succeeded
+            fail_count += failed
+            permits = following
+    
+    return processed, unique_addresses, cache_hits, success_count, fail_count
+
+
+def geocode_permits(fast_stats=False):
     """Main geocoding function"""
     print("=" * 70)
     print("🗺️  PERMIT GEOCODING SERVICE")
     print("=" * 70)
     print()
     
+    start_metrics_server()
+    
     # Test API connection first
     if USE_GEOCLIENT:
         print("🔧 Testing NYC Geoclient API connection...")
@@ -308,7 +861,7 @@ def geocode_permits():
                 'street': 'Centre Street',
                 'borough': 'Manhattan'
             }
-            test_response = requests.get(test_url, params=test_params, headers=test_headers, timeout=5)
+            test_response = httpx.get(test_url, params=test_params, headers=test_headers, timeout=5)
             if test_response.status_code == 200:
                 print("✅ NYC Geoclient API is working!\n")
             else:
@@ -329,129 +882,57 @@ def geocode_permits():
     
     # Get statistics
     print("📊 Fetching statistics...")
-    cur.execute("SELECT COUNT(*) as total FROM permits")
-    total_permits = cur.fetchone()['total']
-    
-    cur.execute("SELECT COUNT(*) as with_coords FROM permits WHERE latitude IS NOT NULL AND longitude IS NOT NULL")
-    with_coords = cur.fetchone()['with_coords']
+    total_permits, with_coords, estimated = fetch_statistics(cur, fast_stats)
     
     without_coords = total_permits - with_coords
     print()
-    print(f"📊 Database Statistics:")
+    print(f"📊 Database Statistics{' (estimated)' if estimated else ''}:")
     print(f"   Total permits: {total_permits:,}")
     print(f"   With coordinates: {with_coords:,} ({with_coords/total_permits*100:.1f}%)")
     print(f"   Without coordinates: {without_coords:,} ({without_coords/total_permits*100:.1f}%)")
     print()
     
-    if without_coords == 0:
+    if without_coords == 0 and not estimated:
         print("✅ All permits already have coordinates!")
         cur.close()
         conn.close()
         return
     
     # Fetch permits without coordinates (limited by batch size)
-    # Prioritize permits with BBL (can use NYC Geoclient V2)
-    # Skip permits that have already failed geocoding
-    print(f"🔍 Fetching {min(BATCH_SIZE, without_coords)} permits to geocode...\n")
+    print(f"🔍 Fetching up to {BATCH_SIZE if estimated else min(BATCH_SIZE, without_coords)} permits to geocode...\n")
+    ensure_geocode_index(conn)
     
-    cur.execute("""
-        SELECT id, address, bbl
-        FROM permits 
-        WHERE (latitude IS NULL OR longitude IS NULL)
-            AND address IS NOT NULL 
-            AND address != ''
-            AND (geocode_failed IS NULL OR geocode_failed = FALSE)
-        ORDER BY 
-            CASE WHEN bbl IS NOT NULL AND bbl != '' THEN 0 ELSE 1 END,
-            id
-        LIMIT %s
-    """, (BATCH_SIZE,))
+    # Address normalization happens in Postgres (generated column when available)
+    address_key_sql = address_key_column(cur)
+    candidates_query = CANDIDATES_QUERY.format(address_key=address_key_sql)
+    
+    if DEBUG:
+        cur.execute("EXPLAIN " + candidates_query, (BATCH_SIZE,))
+        print("🔬 Candidate query plan:")
+        for (line,) in cur.fetchall():
+            print(f"   {line}")
+        print()
+    
+    ensure_geocode_cache(conn, address_key_sql)
+    
+    # Stream candidates through a server-side cursor so memory stays flat
+    # even with a large GEOCODE_BATCH_SIZE. WITH HOLD keeps the cursor open
+    # across the per-chunk commits.
+    stream_cur = conn.cursor(name='geocode_stream', withhold=True)
+    stream_cur.execute(candidates_query, (BATCH_SIZE,))
+    conn.commit()
     
-    permits_to_geocode = cur.fetchall()
+    processed, unique_addresses, cache_hits, success_count, fail_count = asyncio.run(
+        geocode_stream(conn, stream_cur)
+    )
+    stream_cur.close()
     
-    if not permits_to_geocode:
+    if not processed:
         print("✅ No permits need geocoding!")
         cur.close()
         conn.close()
         return
     
-    print(f"Processing {len(permits_to_geocode)} permits...\n")
-    
-    # Geocode each permit
-    success_count = 0
-    fail_count = 0
-    start_time = time.time()
-    
-    for i, permit in enumerate(permits_to_geocode, 1):
-        permit_id = permit['id']
-        address = permit['address']
-        bbl = permit.get('bbl')
-        
-        # Extract borough from BBL if available
-        borough = None
-        if bbl and len(str(bbl)) >= 1:
-            borough_map = {
-                '1': 'Manhattan',
-                '2': 'Bronx', 
-                '3': 'Brooklyn',
-                '4': 'Queens',
-                '5': 'Staten Island'
-            }
-            borough = borough_map.get(str(bbl)[0])
-        
-        # Progress indicator every 50 permits
-        if i % 50 == 0:
-            elapsed = time.time() - start_time
-            rate = i / elapsed if elapsed > 0 else 0
-            remaining = len(permits_to_geocode) - i
-            eta = remaining / rate if rate > 0 else 0
-            print(f"\n⏱️  Progress: {i}/{len(permits_to_geocode)} | {rate:.1f} permits/sec | ETA: {eta/60:.1f} min\n")
-        
-        print(f"[{i}/{len(permits_to_geocode)}] Permit #{permit_id}: {address}")
-        if borough:
-            print(f"  🏙️  Borough: {borough} (from BBL)")
-        
-        # Try NYC Geoclient first (if configured and we have BBL)
-        lat, lon = None, None
-        
-        if USE_GEOCLIENT and borough:
-            print(f"  📍 NYC Geoclient V2: {address}")
-            lat, lon = geocode_with_nyc_geoclient(address, borough)
-        
-        # Fallback to Nominatim if NYC Geoclient didn't work or no BBL
-        if lat is None or lon is None:
-            if borough:
-                print(f"  🌐 Trying OpenStreetMap Nominatim...")
-            else:
-                print(f"  ⚠️  No BBL/borough - using OpenStreetMap Nominatim...")
-            lat, lon = geocode_with_nominatim(address)
-        
-        # Update database if we got coordinates
-        if lat is not None and lon is not None:
-            if update_permit_coordinates(conn, permit_id, lat, lon):
-                print(f"  ✅ Success: {lat:.6f}, {lon:.6f}")
-                success_count += 1
-            else:
-                print(f"  ❌ Failed to update database")
-                fail_count += 1
-        else:
-            print(f"  ❌ Could not geocode address")
-            # Mark as failed so we don't retry it
-            try:
-                cur_fail = conn.cursor()
-                cur_fail.execute("UPDATE permits SET geocode_failed = TRUE WHERE id = %s", (permit_id,))
-                conn.commit()
-                cur_fail.close()
-            except Exception as e:
-                print(f"  ⚠️  Could not mark as failed: {e}")
-            fail_count += 1
-        
-        # Rate limiting
-        if i < len(permits_to_geocode):
-            time.sleep(RATE_LIMIT_DELAY)
-        
-        print()
-    
     # Summary
     cur.close()
     conn.close()
@@ -462,9 +943,10 @@ def geocode_permits():
     print(f"✅ Successfully geocoded: {success_count}")
     print(f"❌ Failed to geocode: {fail_count}")
     print(f"📈 Success rate: {success_count/(success_count+fail_count)*100:.1f}%")
+    print(f"♻️  API calls saved: {processed - unique_addresses} duplicates, {cache_hits} cache hits")
     print()
     
-    # Calculate new statistics
+    # Remaining backlog from the counters above - no extra COUNT query
     remaining = without_coords - success_count
     if remaining > 0:
         print(f"📝 Remaining permits without coordinates: {remaining:,}")
@@ -477,8 +959,16 @@ def geocode_permits():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Geocode permits missing latitude/longitude')
+    parser.add_argument('--fast-stats', action='store_true',
+                        help='Use pg_class row estimates instead of exact COUNTs for the statistics')
+    args = parser.parse_args()
+    
+    # LOG_LEVEL=DEBUG prints every permit's result
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s', stream=sys.stdout)
+    
     try:
-        geocode_permits()
+        geocode_permits(fast_stats=args.fast_stats)
     except KeyboardInterrupt:
         print("\n\n⚠️  Geocoding interrupted by user")
         sys.exit(0)
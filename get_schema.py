@@ -3,7 +3,9 @@
 Script to print full database schema
 """
 
+import argparse
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
 import os
 from dotenv import load_dotenv
@@ -20,8 +22,12 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', '')
 }
 
-def get_full_schema():
-    """Get full database schema with all details"""
+def get_full_schema(exact_counts=False):
+    """
+    Get full database schema with all details.
+    Columns, indexes and row counts are each fetched for every table in one
+    query. Row counts are pg_class estimates unless exact_counts is set.
+    """
     conn = psycopg2.connect(**DB_CONFIG)
     cursor = conn.cursor()
     
@@ -39,32 +45,53 @@ def get_full_schema():
     
     tables = cursor.fetchall()
     
+    # Get column details for every table
+    cursor.execute("""
+        SELECT 
+            table_name,
+            column_name,
+            data_type,
+            character_maximum_length,
+            is_nullable,
+            column_default
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+        ORDER BY table_name, ordinal_position;
+    """)
+    columns_by_table = {}
+    for table_name, *col in cursor.fetchall():
+        columns_by_table.setdefault(table_name, []).append(col)
+    
+    # Get indexes for every table
+    cursor.execute("""
+        SELECT tablename, indexname, indexdef
+        FROM pg_indexes
+        WHERE schemaname = 'public'
+        ORDER BY tablename, indexname;
+    """)
+    indexes_by_table = {}
+    for table_name, *idx in cursor.fetchall():
+        indexes_by_table.setdefault(table_name, []).append(idx)
+    
+    # Estimated row counts (kept up to date by autovacuum/ANALYZE, -1 if never analyzed)
+    cursor.execute("""
+        SELECT relname, reltuples::bigint
+        FROM pg_class
+        WHERE relkind IN ('r', 'p')
+        AND relnamespace = 'public'::regnamespace;
+    """)
+    row_estimates = dict(cursor.fetchall())
+    
     for table in tables:
         table_name = table[0]
         print(f"\n{'=' * 100}")
         print(f"TABLE: {table_name}")
         print(f"{'=' * 100}")
         
-        # Get column details
-        cursor.execute("""
-            SELECT 
-                column_name,
-                data_type,
-                character_maximum_length,
-                is_nullable,
-                column_default
-            FROM information_schema.columns
-            WHERE table_schema = 'public' 
-            AND table_name = %s
-            ORDER BY ordinal_position;
-        """, (table_name,))
-        
-        columns = cursor.fetchall()
-        
         print(f"\n{'Column Name':<40} {'Type':<20} {'Nullable':<10} {'Default':<30}")
         print("-" * 100)
         
-        for col in columns:
+        for col in columns_by_table.get(table_name, []):
             col_name, data_type, max_length, nullable, default = col
             if max_length:
                 type_str = f"{data_type}({max_length})"
@@ -78,20 +105,18 @@ def get_full_schema():
             print(f"{col_name:<40} {type_str:<20} {nullable:<10} {default_str:<30}")
         
         # Get row count
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
-        count = cursor.fetchone()[0]
-        print(f"\nRow Count: {count:,}")
-        
-        # Get indexes
-        cursor.execute("""
-            SELECT indexname, indexdef
-            FROM pg_indexes
-            WHERE schemaname = 'public' 
-            AND tablename = %s
-            ORDER BY indexname;
-        """, (table_name,))
+        if exact_counts:
+            cursor.execute(sql.SQL("SELECT COUNT(*) FROM {};").format(sql.Identifier(table_name)))
+            count = cursor.fetchone()[0]
+            print(f"\nRow Count: {count:,}")
+        else:
+            count = row_estimates.get(table_name, -1)
+            if count >= 0:
+                print(f"\nRow Count: ~{count:,} (estimate)")
+            else:
+                print(f"\nRow Count: unknown (table not analyzed yet)")
         
-        indexes = cursor.fetchall()
+        indexes = indexes_by_table.get(table_name, [])
         if indexes:
             print(f"\nIndexes:")
             for idx in indexes:
@@ -102,8 +127,13 @@ def get_full_schema():
     conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Print full database schema')
+    parser.add_argument('--exact-counts', action='store_true',
+                        help='Use exact COUNT(*) row counts instead of pg_class estimates (scans every table)')
+    args = parser.parse_args()
+    
     try:
-        get_full_schema()
+        get_full_schema(exact_counts=args.exact_counts)
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Migration: Add permits.address_normalized
+Stored generated column holding the address with whitespace collapsed and
+upper-cased - the key geocode_permits.py dedups and caches on. Computing it
+once on write means the geocoder reads it instead of normalizing every row,
+and the index makes geocode_cache/duplicate lookups index scans.
+"""
+import psycopg2
+from db import DDL_CONN_KWARGS, migration_applied, record_migration
+
+MIGRATION_NAME = 'migrate_add_address_normalized'
+
+def run_migration():
+    conn = psycopg2.connect(**DDL_CONN_KWARGS)
+    cur = conn.cursor()
+
+    try:
+        if migration_applied(cur, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, skipping")
+            return
+        
+        print("Starting migration: permits.address_normalized")
+
+        # Step 1: Add the generated column (rewrites permits once)
+        print("Adding generated column: address_normalized")
+        cur.execute(r"""
+            ALTER TABLE permits
+            ADD COLUMN IF NOT EXISTS address_normalized TEXT
+            GENERATED ALWAYS AS (upper(btrim(regexp_replace(address, '\s+', ' ', 'g')))) STORED
+        """)
+        conn.commit()
+
+        # Step 2: Index it without blocking writes (CONCURRENTLY needs autocommit)
+        print("Creating index: idx_permits_address_normalized")
+        conn.autocommit = True
+        cur.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_permits_address_normalized
+            ON permits (address_normalized)
+        """)
+
+        # Step 3: Verify
+        cur.execute("""
+            SELECT COUNT(DISTINCT address_normalized) FROM permits
+            WHERE address_normalized IS NOT NULL AND address_normalized <> ''
+        """)
+        print(f"Distinct normalized addresses: {cur.fetchone()[0]:,}")
+
+        record_migration(cur, MIGRATION_NAME)  # autocommit is on
+        print("Migration complete!")
+
+    except Exception as e:
+        if not conn.autocommit:
+            conn.rollback()
+        print(f"Migration failed: {e}")
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+if __name__ == '__main__':
+    run_migration()
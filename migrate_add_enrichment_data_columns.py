@@ -5,21 +5,56 @@ This allows storing contact data per-owner instead of per-building
 """
 import psycopg2
 import psycopg2.extras
-import os
-from dotenv import load_dotenv
-load_dotenv('dashboard_html/.env')
+from db import DDL_CONN_KWARGS, migration_applied, record_migration
+
+MIGRATION_NAME = 'migrate_add_enrichment_data_columns'
+
+# (index name, definition after "ON user_enrichments")
+ENRICHMENT_INDEXES = [
+    # Containment lookups, e.g. enriched_phones @> '[{"number": "..."}]'.
+    # jsonb_path_ops only supports @>, but is smaller and faster than the default opclass
+    ("idx_user_enrichments_phones_gin", "USING GIN (enriched_phones jsonb_path_ops)"),
+    ("idx_user_enrichments_emails_gin", "USING GIN (enriched_emails jsonb_path_ops)"),
+    # "Was this owner already enriched?" - most rows never get a person id
+    ("idx_user_enrichments_person_id", "(enriched_person_id) WHERE enriched_person_id IS NOT NULL"),
+]
+
+def add_enrichment_columns(cur):
+    """Add the per-owner enrichment data columns"""
+    print("Adding enriched_phones column...")
+    cur.execute("""
+        ALTER TABLE user_enrichments 
+        ADD COLUMN IF NOT EXISTS enriched_phones JSONB
+    """)
+    
+    print("Adding enriched_emails column...")
+    cur.execute("""
+        ALTER TABLE user_enrichments 
+        ADD COLUMN IF NOT EXISTS enriched_emails JSONB
+    """)
+    
+    print("Adding enriched_person_id column...")
+    cur.execute("""
+        ALTER TABLE user_enrichments 
+        ADD COLUMN IF NOT EXISTS enriched_person_id TEXT
+    """)
+    
+    print("Adding enriched_at column...")
+    cur.execute("""
+        ALTER TABLE user_enrichments 
+        ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMP
+    """)
+
 
 def run_migration():
-    conn = psycopg2.connect(
-        host=os.getenv('DB_HOST'),
-        port=os.getenv('DB_PORT'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        database=os.getenv('DB_NAME')
-    )
+    conn = psycopg2.connect(**DDL_CONN_KWARGS)
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     
     try:
+        if migration_applied(cur, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, skipping")
+            return
+        
         print("Starting migration: Add enrichment data columns to user_enrichments")
         
         # Check if columns already exist
@@ -28,34 +63,21 @@ def run_migration():
             WHERE table_name = 'user_enrichments' AND column_name = 'enriched_phones'
         """)
         if cur.fetchone():
-            print("Columns already exist, skipping migration")
-            return
-        
-        # Add new columns for storing per-owner enrichment data
-        print("Adding enriched_phones column...")
-        cur.execute("""
-            ALTER TABLE user_enrichments 
-            ADD COLUMN IF NOT EXISTS enriched_phones JSONB
-        """)
-        
-        print("Adding enriched_emails column...")
-        cur.execute("""
-            ALTER TABLE user_enrichments 
-            ADD COLUMN IF NOT EXISTS enriched_emails JSONB
-        """)
-        
-        print("Adding enriched_person_id column...")
-        cur.execute("""
-            ALTER TABLE user_enrichments 
-            ADD COLUMN IF NOT EXISTS enriched_person_id TEXT
-        """)
-        
-        print("Adding enriched_at column...")
-        cur.execute("""
-            ALTER TABLE user_enrichments 
-            ADD COLUMN IF NOT EXISTS enriched_at TIMESTAMP
-        """)
+            print("Columns already exist, skipping to indexes")
+        else:
+            add_enrichment_columns(cur)
+        # End the transaction the checks above opened; autocommit can't be
+        # switched on inside one
+        conn.commit()
         
+        # Index the enrichment data without blocking writes (CONCURRENTLY needs autocommit).
+        # user_enrichments is written once per paid lookup, so the extra index upkeep is cheap.
+        conn.autocommit = True
+        for index_name, definition in ENRICHMENT_INDEXES:
+            print(f"Creating index: {index_name}")
+            cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON user_enrichments {definition}")
+        conn.autocommit = False
+        record_migration(cur, MIGRATION_NAME)
         conn.commit()
         
         # Verify
@@ -71,7 +93,8 @@ def run_migration():
         print("\nMigration complete!")
         
     except Exception as e:
-        conn.rollback()
+        if not conn.autocommit:
+            conn.rollback()
         print(f"Migration failed: {e}")
         raise
     finally:
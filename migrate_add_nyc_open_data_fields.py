@@ -8,38 +8,43 @@ from NYC Open Data API to enable rich permit details display.
 Dataset: https://data.cityofnewyork.us/Housing-Development/DOB-Permit-Issuance/ipu4-2q9a
 """
 
-from dotenv import load_dotenv
-load_dotenv()
-
 import os
+import sys
+import logging
 import psycopg2
 from datetime import datetime
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': int(os.getenv('DB_PORT', '5432')),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD'),
-    'database': os.getenv('DB_NAME', 'railway')
-}
+from db import DDL_CONN_KWARGS, migration_applied, record_migration
+
+MIGRATION_NAME = 'migrate_add_nyc_open_data_fields'
+
+# Per-column/per-index detail lines are logged at INFO; set LOG_LEVEL=WARNING to hide them
+log = logging.getLogger(__name__)
+
+# Index build memory for this session (sorts for B-tree builds spill to disk below this)
+MAINTENANCE_WORK_MEM = os.getenv('MIGRATION_MAINTENANCE_WORK_MEM', '1GB')
+PARALLEL_MAINTENANCE_WORKERS = int(os.getenv('MIGRATION_PARALLEL_WORKERS', '4'))
 
 
 def run_migration():
     """Run the database migration"""
     
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = psycopg2.connect(**DDL_CONN_KWARGS)
     cursor = conn.cursor()
     
     print("=" * 100)
     print("DATABASE MIGRATION: Add NYC Open Data Fields to Permits Table")
     print("=" * 100)
-    print(f"Database: {DB_CONFIG['database']}")
-    print(f"Host: {DB_CONFIG['host']}")
+    print(f"Database: {conn.info.dbname}")
+    print(f"Host: {conn.info.host}")
     print(f"Time: {datetime.now()}")
     print("=" * 100)
     
     try:
+        if migration_applied(cursor, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, skipping")
+            return True
+        
         # Start transaction
         print("\n🔄 Starting migration...\n")
         
@@ -50,155 +55,191 @@ def run_migration():
         # Add new columns to permits table
         migrations = [
             # Property Information
-            ("borough", "VARCHAR(2)", "Borough code (1=Manhattan, 2=Bronx, 3=Brooklyn, 4=Queens, 5=Staten Island)"),
-            ("house_number", "VARCHAR(50)", "House number"),
-            ("street_name", "VARCHAR(255)", "Street name"),
-            ("zip_code", "VARCHAR(10)", "Zip code"),
-            ("community_board", "VARCHAR(3)", "Community board (3-digit: borough + CB number)"),
+            ("borough", "TEXT", "Borough name as published (MANHATTAN, BRONX, ...) - build_bbl maps it to 1-5"),
+            ("house_number", "TEXT", "House number"),
+            ("street_name", "TEXT", "Street name"),
+            ("zip_code", "TEXT", "Zip code"),
+            ("community_board", "TEXT", "Community board (3-digit: borough + CB number)"),
             
             # Job Details
-            ("job_doc_number", "VARCHAR(50)", "Job document number"),
-            ("self_cert", "VARCHAR(10)", "Self certification status"),
-            ("bldg_type", "VARCHAR(50)", "Building type (1-2-3 Family or Other)"),
-            ("residential", "VARCHAR(10)", "Residential flag"),
-            ("special_district_1", "VARCHAR(50)", "Special district 1"),
-            ("special_district_2", "VARCHAR(50)", "Special district 2"),
-            ("work_type", "VARCHAR(50)", "Work type (PL=Plumbing, BL=Boiler, MH=Mechanical, etc.)"),
+            ("job_doc_number", "TEXT", "Job document number"),
+            ("self_cert", "TEXT", "Self certification status"),
+            ("bldg_type", "TEXT", "Building type (1-2-3 Family or Other)"),
+            ("residential", "TEXT", "Residential flag"),
+            ("special_district_1", "TEXT", "Special district 1"),
+            ("special_district_2", "TEXT", "Special district 2"),
+            ("work_type", "TEXT", "Work type (PL=Plumbing, BL=Boiler, MH=Mechanical, etc.)"),
             
             # Permit Details  
-            ("permit_status", "VARCHAR(50)", "Permit status"),
-            ("filing_status", "VARCHAR(50)", "Filing status"),
-            ("permit_type", "VARCHAR(50)", "Permit type (DM=Demolition, EW=Equipment Work, etc.)"),
-            ("permit_sequence", "VARCHAR(50)", "Permit sequence number"),
-            ("permit_subtype", "VARCHAR(50)", "Permit subtype"),
-            ("oil_gas", "VARCHAR(10)", "Oil/Gas flag"),
+            ("permit_status", "TEXT", "Permit status"),
+            ("filing_status", "TEXT", "Filing status"),
+            ("permit_type", "TEXT", "Permit type (DM=Demolition, EW=Equipment Work, etc.)"),
+            ("permit_sequence", "TEXT", "Permit sequence number"),
+            ("permit_subtype", "TEXT", "Permit subtype"),
+            ("oil_gas", "TEXT", "Oil/Gas flag"),
             
             # Permittee Information
-            ("permittee_first_name", "VARCHAR(100)", "Permittee first name"),
-            ("permittee_last_name", "VARCHAR(100)", "Permittee last name"),
-            ("permittee_business_name", "VARCHAR(255)", "Permittee business name"),
-            ("permittee_phone", "VARCHAR(50)", "Permittee phone number"),
-            ("permittee_license_type", "VARCHAR(50)", "Permittee license type"),
-            ("permittee_license_number", "VARCHAR(50)", "Permittee license number"),
-            ("act_as_superintendent", "VARCHAR(10)", "Acts as superintendent flag"),
-            ("permittee_other_title", "VARCHAR(100)", "Permittee other title"),
-            ("hic_license", "VARCHAR(50)", "HIC license"),
+            ("permittee_first_name", "TEXT", "Permittee first name"),
+            ("permittee_last_name", "TEXT", "Permittee last name"),
+            ("permittee_business_name", "TEXT", "Permittee business name"),
+            ("permittee_phone", "TEXT", "Permittee phone number"),
+            ("permittee_license_type", "TEXT", "Permittee license type"),
+            ("permittee_license_number", "TEXT", "Permittee license number"),
+            ("act_as_superintendent", "TEXT", "Acts as superintendent flag"),
+            ("permittee_other_title", "TEXT", "Permittee other title"),
+            ("hic_license", "TEXT", "HIC license"),
             
             # Site Safety Manager
-            ("site_safety_mgr_first_name", "VARCHAR(100)", "Site safety manager first name"),
-            ("site_safety_mgr_last_name", "VARCHAR(100)", "Site safety manager last name"),
-            ("site_safety_mgr_business_name", "VARCHAR(255)", "Site safety manager business name"),
+            ("site_safety_mgr_first_name", "TEXT", "Site safety manager first name"),
+            ("site_safety_mgr_last_name", "TEXT", "Site safety manager last name"),
+            ("site_safety_mgr_business_name", "TEXT", "Site safety manager business name"),
             
             # Superintendent
-            ("superintendent_name", "VARCHAR(255)", "Superintendent first & last name"),
-            ("superintendent_business_name", "VARCHAR(255)", "Superintendent business name"),
+            ("superintendent_name", "TEXT", "Superintendent first & last name"),
+            ("superintendent_business_name", "TEXT", "Superintendent business name"),
             
             # Owner Information (Enhanced)
-            ("owner_business_type", "VARCHAR(100)", "Owner business type"),
-            ("non_profit", "VARCHAR(10)", "Non-profit flag"),
-            ("owner_business_name", "VARCHAR(255)", "Owner business name"),
-            ("owner_first_name", "VARCHAR(100)", "Owner first name"),
-            ("owner_last_name", "VARCHAR(100)", "Owner last name"),
-            ("owner_house_number", "VARCHAR(50)", "Owner house number"),
-            ("owner_street_name", "VARCHAR(255)", "Owner street name"),
-            ("owner_city", "VARCHAR(100)", "Owner city"),
-            ("owner_state", "VARCHAR(2)", "Owner state"),
-            ("owner_zip_code", "VARCHAR(10)", "Owner zip code"),
-            ("owner_phone", "VARCHAR(50)", "Owner phone number"),
+            ("owner_business_type", "TEXT", "Owner business type"),
+            ("non_profit", "TEXT", "Non-profit flag"),
+            ("owner_business_name", "TEXT", "Owner business name"),
+            ("owner_first_name", "TEXT", "Owner first name"),
+            ("owner_last_name", "TEXT", "Owner last name"),
+            ("owner_house_number", "TEXT", "Owner house number"),
+            ("owner_street_name", "TEXT", "Owner street name"),
+            ("owner_city", "TEXT", "Owner city"),
+            ("owner_state", "TEXT", "Owner state"),
+            ("owner_zip_code", "TEXT", "Owner zip code"),
+            ("owner_phone", "TEXT", "Owner phone number"),
             
             # System/GIS Fields
             ("dob_run_date", "DATE", "DOB data run date"),
-            ("permit_si_no", "VARCHAR(50)", "Permit SI number"),
-            ("council_district", "VARCHAR(10)", "NYC council district"),
-            ("census_tract", "VARCHAR(20)", "Census tract"),
-            ("nta_name", "VARCHAR(255)", "Neighborhood Tabulation Area name"),
+            ("permit_si_no", "TEXT", "Permit SI number"),
+            ("council_district", "TEXT", "NYC council district"),
+            ("census_tract", "TEXT", "Census tract"),
+            ("nta_name", "TEXT", "Neighborhood Tabulation Area name"),
             
             # API Metadata
-            ("api_source", "VARCHAR(50)", "Source of data (nyc_open_data, selenium, manual)"),
+            ("api_source", "TEXT", "Source of data (nyc_open_data, selenium, manual)"),
             ("api_last_updated", "TIMESTAMP", "Last updated from API"),
         ]
         
-        print("📝 Adding new columns to permits table:\n")
+        print("📝 Adding new columns to permits table...")
         
-        added_count = 0
-        skipped_count = 0
+        # Existing permits columns, straight from the catalog (one query)
+        cursor.execute("""
+            SELECT attname
+            FROM pg_attribute
+            WHERE attrelid = 'permits'::regclass AND attnum > 0 AND NOT attisdropped
+        """)
+        existing = {row[0] for row in cursor.fetchall()}
         
-        for column_name, data_type, description in migrations:
-            # Check if column already exists
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = 'permits' AND column_name = %s
-            """, (column_name,))
-            
-            if cursor.fetchone():
-                print(f"   ⏭️  SKIP: {column_name:<30} (already exists)")
-                skipped_count += 1
-                continue
-            
-            # Add the column
-            sql = f"ALTER TABLE permits ADD COLUMN {column_name} {data_type}"
-            cursor.execute(sql)
-            print(f"   ✅ ADD:  {column_name:<30} {data_type:<20} -- {description}")
-            added_count += 1
+        added = [m for m in migrations if m[0] not in existing]
+        skipped = [m for m in migrations if m[0] in existing]
+        for column_name, data_type, description in added:
+            log.info(f"   ✅ ADD:  {column_name:<30} {data_type:<20} -- {description}")
+        for column_name, _, _ in skipped:
+            log.info(f"   ⏭️  SKIP: {column_name:<30} (already exists)")
         
-        # Create indexes on commonly queried fields
-        print("\n📊 Creating indexes on new fields:\n")
+        # Add every column in one ALTER TABLE (one round-trip, one table lock).
+        # Fixed-width columns go first so they don't land between TEXT columns
+        # with alignment padding; the sort is stable, so the rest keep list order.
+        cursor.execute("ALTER TABLE permits " + ",\n".join(
+            f"ADD COLUMN IF NOT EXISTS {column_name} {data_type}"
+            for column_name, data_type, _ in sorted(migrations, key=lambda m: m[1] == 'TEXT')
+        ))
         
+        # Commit the column changes before building indexes
+        conn.commit()
+        
+        # Create indexes on commonly queried fields. CONCURRENTLY keeps permits
+        # writable during the build, but can't run inside a transaction block
+        # (or a multi-statement execute), so each index is its own autocommit statement.
+        print("📊 Creating indexes on new fields...")
+        
+        # (index name, column, index definition after "ON permits")
+        # Only indexes the app actually queries - each one costs every permit insert.
         indexes = [
-            ("idx_permits_borough", "borough"),
-            ("idx_permits_zip_code", "zip_code"),
-            ("idx_permits_work_type", "work_type"),
-            ("idx_permits_permit_type_new", "permit_type"),
-            ("idx_permits_permit_status_new", "permit_status"),
-            ("idx_permits_permittee_business", "permittee_business_name"),
-            ("idx_permits_owner_business_name", "owner_business_name"),
-            ("idx_permits_api_source", "api_source"),
-            ("idx_permits_dob_run_date", "dob_run_date"),
+            # Dashboard: AND p.borough = %s ... ORDER BY p.issue_date DESC LIMIT n
+            ("idx_permits_borough_issue_date", "borough, issue_date", "(borough, issue_date DESC)"),
+            # Enrichment: WHERE p.zip_code = ANY(%s)
+            ("idx_permits_zip_code", "zip_code", "(zip_code)"),
+            # Per-source counts and audits
+            ("idx_permits_api_source", "api_source", "(api_source)"),
+            # Permits are loaded in run-date order and rarely deleted, so heap order
+            # tracks dob_run_date - a BRIN index is a tiny fraction of a B-tree's size
+            ("idx_permits_dob_run_date_brin", "dob_run_date", "USING BRIN (dob_run_date) WITH (pages_per_range = 32)"),
         ]
         
-        for index_name, column_name in indexes:
-            try:
-                cursor.execute(f"""
-                    CREATE INDEX IF NOT EXISTS {index_name} 
-                    ON permits({column_name})
-                """)
-                print(f"   ✅ INDEX: {index_name} on {column_name}")
-            except Exception as e:
-                print(f"   ⚠️  INDEX: {index_name} - {e}")
-        
-        # Commit transaction
-        conn.commit()
+        # Indexes replaced by the definitions above
+        replaced_indexes = [
+            "idx_permits_dob_run_date",
+            "idx_permits_borough",              # leading column of idx_permits_borough_issue_date
+            "idx_permits_work_type",            # work/permit type and status are only
+            "idx_permits_permit_type_new",      # filtered in Socrata API queries, never
+            "idx_permits_permit_status_new",    # in SQL against permits
+            "idx_permits_permittee_business",   # name searches use ILIKE '%...%', which
+            "idx_permits_owner_business_name",  # a plain B-tree can't serve
+        ]
         
-        print("\n" + "=" * 100)
-        print("✅ MIGRATION COMPLETED SUCCESSFULLY")
-        print("=" * 100)
-        print(f"   Columns added: {added_count}")
-        print(f"   Columns skipped (already exist): {skipped_count}")
-        print(f"   Total columns in migration: {len(migrations)}")
-        print("=" * 100)
+        index_errors = 0
+        conn.autocommit = True
+        try:
+            # Session-level (not SET LOCAL: each concurrent build is its own
+            # transaction) - only affects this connection, not other clients.
+            # synchronous_commit is already off via DDL_CONN_KWARGS.
+            cursor.execute("SELECT set_config('maintenance_work_mem', %s, false)", (MAINTENANCE_WORK_MEM,))
+            cursor.execute("SELECT set_config('max_parallel_maintenance_workers', %s, false)", (str(PARALLEL_MAINTENANCE_WORKERS),))
+            for index_name, column_name, definition in indexes:
+                try:
+                    cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON permits {definition}")
+                    log.info(f"   ✅ INDEX: {index_name} on {column_name}")
+                except Exception as e:
+                    print(f"   ⚠️  INDEX: {index_name} - {e}")
+                    index_errors += 1
+            for index_name in replaced_indexes:
+                try:
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+                    log.info(f"   🗑️  DROP:  {index_name} (replaced)")
+                except Exception as e:
+                    print(f"   ⚠️  DROP:  {index_name} - {e}")
+                    index_errors += 1
+        finally:
+            conn.autocommit = False
+        
+        # Leave it unrecorded if an index step failed, so a re-run retries it
+        if not index_errors:
+            record_migration(cursor, MIGRATION_NAME)
+            conn.commit()
         
-        # Print updated schema summary
-        print("\n📋 Updated Permits Table Schema:\n")
         cursor.execute("""
             SELECT column_name, data_type, character_maximum_length
             FROM information_schema.columns
             WHERE table_name = 'permits'
             ORDER BY ordinal_position
         """)
-        
         columns = cursor.fetchall()
-        print(f"{'Column Name':<40} {'Type':<30}")
-        print("-" * 70)
-        for col in columns:
-            col_name, data_type, max_length = col
-            if max_length:
-                type_str = f"{data_type}({max_length})"
-            else:
-                type_str = data_type
-            print(f"{col_name:<40} {type_str:<30}")
-        
-        print(f"\nTotal columns: {len(columns)}")
+        
+        # Build the summary and schema table, then write it in one go
+        report = [
+            "",
+            "=" * 100,
+            "✅ MIGRATION COMPLETED SUCCESSFULLY",
+            "=" * 100,
+            f"   Columns added: {len(added)}",
+            f"   Columns skipped (already exist): {len(skipped)}",
+            f"   Total columns in migration: {len(migrations)}",
+            "=" * 100,
+            "",
+            "📋 Updated Permits Table Schema:",
+            "",
+            f"{'Column Name':<40} {'Type':<30}",
+            "-" * 70,
+        ]
+        for col_name, data_type, max_length in columns:
+            type_str = f"{data_type}({max_length})" if max_length else data_type
+            report.append(f"{col_name:<40} {type_str:<30}")
+        report.append(f"\nTotal columns: {len(columns)}\n")
+        sys.stdout.write("\n".join(report))
         
     except Exception as e:
         conn.rollback()
@@ -215,7 +256,7 @@ def run_migration():
 
 
 if __name__ == '__main__':
-    import sys
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s', stream=sys.stdout)
     
     print("\n⚠️  WARNING: This migration will modify your database schema.")
     print("   Make sure you have a backup before proceeding.\n")
@@ -15,31 +15,15 @@ Data Sources:
 """
 
 import psycopg2
-import os
-from dotenv import load_dotenv
+from db import DDL_CONN_KWARGS, migration_applied, record_migration
 
-# Load .env from dashboard_html subdirectory
-load_dotenv('dashboard_html/.env')
+MIGRATION_NAME = 'migrate_add_tax_lien_data'
 
 def get_db_connection():
     """Create database connection from environment variables"""
     try:
-        # Support both PGHOST and DB_HOST patterns
-        host = os.getenv('PGHOST') or os.getenv('DB_HOST')
-        database = os.getenv('PGDATABASE') or os.getenv('DB_NAME')
-        user = os.getenv('PGUSER') or os.getenv('DB_USER')
-        password = os.getenv('PGPASSWORD') or os.getenv('DB_PASSWORD')
-        port = os.getenv('PGPORT') or os.getenv('DB_PORT', '5432')
-        
-        print(f"Connecting to: {host}:{port}/{database}")
-        
-        conn = psycopg2.connect(
-            host=host,
-            database=database,
-            user=user,
-            password=password,
-            port=port
-        )
+        conn = psycopg2.connect(**DDL_CONN_KWARGS)
+        print(f"Connecting to: {conn.info.host}:{conn.info.port}/{conn.info.dbname}")
         return conn
     except Exception as e:
         print(f"❌ Database connection error: {e}")
@@ -56,6 +40,10 @@ def run_migration():
     cur = conn.cursor()
     
     try:
+        if migration_applied(cur, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, skipping")
+            return
+        
         print("=" * 70)
         print("🔧 Adding Tax Delinquency & Liens Fields to Buildings Table")
         print("=" * 70)
@@ -88,19 +76,19 @@ def run_migration():
             conn.close()
             return
         
-        # Add tax delinquency columns
-        print("  � Adding tax delinquency columns...")
+        # All columns go in one ALTER TABLE - one lock acquisition and one
+        # catalog update instead of one per group
+        print("  💸 Adding tax delinquency columns...")
+        print("  💰 Adding ECB violation/lien columns...")
+        print("  🏗️  Adding DOB violation columns...")
+        print("  📅 Adding metadata columns...")
         cur.execute("""
             ALTER TABLE buildings 
+            -- Tax delinquency
             ADD COLUMN IF NOT EXISTS has_tax_delinquency BOOLEAN DEFAULT FALSE,
             ADD COLUMN IF NOT EXISTS tax_delinquency_count INT DEFAULT 0,
-            ADD COLUMN IF NOT EXISTS tax_delinquency_water_only BOOLEAN DEFAULT FALSE
-        """)
-        
-        # Add ECB violations columns (these have financial data)
-        print("  💰 Adding ECB violation/lien columns...")
-        cur.execute("""
-            ALTER TABLE buildings 
+            ADD COLUMN IF NOT EXISTS tax_delinquency_water_only BOOLEAN DEFAULT FALSE,
+            -- ECB violations (these have financial data)
             ADD COLUMN IF NOT EXISTS ecb_violation_count INT DEFAULT 0,
             ADD COLUMN IF NOT EXISTS ecb_total_balance DECIMAL(12,2) DEFAULT 0,
             ADD COLUMN IF NOT EXISTS ecb_open_violations INT DEFAULT 0,
@@ -111,41 +99,31 @@ def run_migration():
             ADD COLUMN IF NOT EXISTS ecb_respondent_name VARCHAR(255),
             ADD COLUMN IF NOT EXISTS ecb_respondent_address VARCHAR(500),
             ADD COLUMN IF NOT EXISTS ecb_respondent_city VARCHAR(100),
-            ADD COLUMN IF NOT EXISTS ecb_respondent_zip VARCHAR(10)
-        """)
-        
-        # Add DOB violations columns
-        print("  � Adding DOB violation columns...")
-        cur.execute("""
-            ALTER TABLE buildings 
+            ADD COLUMN IF NOT EXISTS ecb_respondent_zip VARCHAR(10),
+            -- DOB violations
             ADD COLUMN IF NOT EXISTS dob_violation_count INT DEFAULT 0,
-            ADD COLUMN IF NOT EXISTS dob_open_violations INT DEFAULT 0
-        """)
-        
-        # Add timestamp for when tax/lien data was last updated
-        print("  📅 Adding metadata columns...")
-        cur.execute("""
-            ALTER TABLE buildings 
+            ADD COLUMN IF NOT EXISTS dob_open_violations INT DEFAULT 0,
+            -- When tax/lien data was last updated
             ADD COLUMN IF NOT EXISTS tax_lien_last_checked TIMESTAMP
         """)
+        conn.commit()
         
-        # Create indexes for efficient filtering
+        # Create indexes for efficient filtering. buildings is already populated,
+        # so build them without blocking writes (CONCURRENTLY needs autocommit).
         print("  🔍 Creating indexes...")
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_buildings_has_tax_delinquency 
-            ON buildings(has_tax_delinquency) WHERE has_tax_delinquency = TRUE
-        """)
-        
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_buildings_ecb_balance 
-            ON buildings(ecb_total_balance) WHERE ecb_total_balance > 0
-        """)
-        
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_buildings_ecb_open 
-            ON buildings(ecb_open_violations) WHERE ecb_open_violations > 0
-        """)
+        conn.autocommit = True
+        for index_sql in [
+            """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_buildings_has_tax_delinquency 
+               ON buildings(has_tax_delinquency) WHERE has_tax_delinquency = TRUE""",
+            """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_buildings_ecb_balance 
+               ON buildings(ecb_total_balance) WHERE ecb_total_balance > 0""",
+            """CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_buildings_ecb_open 
+               ON buildings(ecb_open_violations) WHERE ecb_open_violations > 0""",
+        ]:
+            cur.execute(index_sql)
+        conn.autocommit = False
         
+        record_migration(cur, MIGRATION_NAME)
         conn.commit()
         print()
         print("=" * 70)
@@ -172,7 +150,8 @@ def run_migration():
         print("\n💡 Next step: Run step4_enrich_from_tax_liens.py to populate data")
         
     except Exception as e:
-        conn.rollback()
+        if not conn.autocommit:
+            conn.rollback()
         print(f"❌ Migration failed: {str(e)}")
         raise
     finally:
@@ -6,20 +6,10 @@ This allows the API scraper to properly update permits when their status changes
 (e.g., expired → renewed) instead of skipping them as duplicates.
 """
 
-import os
-from dotenv import load_dotenv
 import psycopg2
 from datetime import datetime
 
-load_dotenv()
-
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD')
-}
+from db import CONN_KWARGS
 
 print("=" * 80)
 print("ADD UNIQUE CONSTRAINT TO permit_no")
@@ -28,7 +18,7 @@ print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print()
 
 try:
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = psycopg2.connect(**CONN_KWARGS)
     cur = conn.cursor()
     
     # Step 1: Check for duplicate permit_no values
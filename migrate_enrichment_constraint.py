@@ -5,22 +5,19 @@ Changes from (user_id, building_id) to (user_id, building_id, owner_name_searche
 This allows multiple owners to be enriched per building per user
 """
 import psycopg2
-import psycopg2.extras
-import os
-from dotenv import load_dotenv
-load_dotenv('dashboard_html/.env')
+from db import DDL_CONN_KWARGS, migration_applied, record_migration
+
+MIGRATION_NAME = 'migrate_enrichment_constraint'
 
 def run_migration():
-    conn = psycopg2.connect(
-        host=os.getenv('DB_HOST'),
-        port=os.getenv('DB_PORT'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        database=os.getenv('DB_NAME')
-    )
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    conn = psycopg2.connect(**DDL_CONN_KWARGS)
+    cur = conn.cursor()
     
     try:
+        if migration_applied(cur, MIGRATION_NAME):
+            print(f"{MIGRATION_NAME} already applied, skipping")
+            return
+        
         print("Starting migration: user_enrichments constraint fix")
         
         # Step 1: Check existing constraint
@@ -30,19 +27,15 @@ def run_migration():
             AND contype = 'u'
         """)
         existing = cur.fetchall()
-        print(f"Existing unique constraints: {[r['conname'] for r in existing]}")
+        print(f"Existing unique constraints: {[conname for conname, in existing]}")
         
-        # Step 2: Drop the old constraint
+        # Steps 2-3: Swap the old constraint for one that includes owner_name_searched
+        # (one ALTER TABLE: one round-trip, one lock)
         print("Dropping old constraint: user_enrichments_user_id_building_id_key")
-        cur.execute("""
-            ALTER TABLE user_enrichments 
-            DROP CONSTRAINT IF EXISTS user_enrichments_user_id_building_id_key
-        """)
-        
-        # Step 3: Add new constraint that includes owner_name_searched
         print("Adding new constraint: user_enrichments_user_building_owner_key")
         cur.execute("""
             ALTER TABLE user_enrichments 
+            DROP CONSTRAINT IF EXISTS user_enrichments_user_id_building_id_key,
             ADD CONSTRAINT user_enrichments_user_building_owner_key 
             UNIQUE (user_id, building_id, owner_name_searched)
         """)
@@ -55,8 +48,9 @@ def run_migration():
             AND contype = 'u'
         """)
         new_constraints = cur.fetchall()
-        print(f"New unique constraints: {[(r['conname'], r['def']) for r in new_constraints]}")
+        print(f"New unique constraints: {new_constraints}")
         
+        record_migration(cur, MIGRATION_NAME)
         conn.commit()
         print("Migration complete!")
         
@@ -11,23 +11,11 @@ This migration:
 5. Links permits to contacts
 """
 
-import os
-from dotenv import load_dotenv
 import psycopg2
 import psycopg2.extras
 from datetime import datetime
 
-load_dotenv()
-
-# Database connection
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
-    DB_HOST = os.getenv('DB_HOST')
-    DB_PORT = os.getenv('DB_PORT', '5432')
-    DB_USER = os.getenv('DB_USER')
-    DB_PASSWORD = os.getenv('DB_PASSWORD')
-    DB_NAME = os.getenv('DB_NAME')
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+from db import CONN_KWARGS
 
 print("=" * 80)
 print("CONTACTS TABLE RESTRUCTURE MIGRATION")
@@ -36,7 +24,7 @@ print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print()
 
 try:
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.RealDictCursor)
+    conn = psycopg2.connect(**CONN_KWARGS, cursor_factory=psycopg2.extras.RealDictCursor)
     cur = conn.cursor()
     
     # Step 1: Kill any blocking queries on contacts table
@@ -6,23 +6,14 @@ and many-to-many relationships with permits
 SAFER APPROACH: Rename old table instead of dropping
 """
 
-import os
-from dotenv import load_dotenv
 import psycopg2
 import psycopg2.extras
 from datetime import datetime
 
-load_dotenv()
+from db import CONN_KWARGS
 
-# Database connection
-DATABASE_URL = os.getenv('DATABASE_URL')
-if not DATABASE_URL:
-    DB_HOST = os.getenv('DB_HOST')
-    DB_PORT = os.getenv('DB_PORT', '5432')
-    DB_USER = os.getenv('DB_USER')
-    DB_PASSWORD = os.getenv('DB_PASSWORD')
-    DB_NAME = os.getenv('DB_NAME')
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Rows fetched per round-trip when streaming permits, and rows per INSERT page
+CONTACT_BATCH_SIZE = 10000
 
 print("=" * 80)
 print("CONTACTS TABLE RESTRUCTURE MIGRATION (SAFE VERSION)")
@@ -31,25 +22,23 @@ print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 print()
 
 try:
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=psycopg2.extras.RealDictCursor)
+    conn = psycopg2.connect(**CONN_KWARGS)
     cur = conn.cursor()
     
     # Step 1: Rename old contacts table as backup
     print("Step 1: Backing up old contacts table...")
+    # Also drop old assignment_log if it exists - both in one round-trip
     try:
-        cur.execute("ALTER TABLE IF EXISTS contacts RENAME TO contacts_old_backup;")
+        cur.execute("""
+            ALTER TABLE IF EXISTS contacts RENAME TO contacts_old_backup;
+            DROP TABLE IF EXISTS assignment_log CASCADE;
+        """)
         conn.commit()
         print("   ✅ Old contacts table renamed to contacts_old_backup")
-    except Exception as e:
-        print(f"   ℹ️  Table may not exist or already renamed: {e}")
-    
-    # Also drop old assignment_log if it exists
-    try:
-        cur.execute("DROP TABLE IF EXISTS assignment_log CASCADE;")
-        conn.commit()
         print("   ✅ Dropped assignment_log (will not be recreated)")
     except Exception as e:
-        print(f"   ℹ️  assignment_log: {e}")
+        conn.rollback()
+        print(f"   ℹ️  Table may not exist or already renamed: {e}")
     
     print()
     
@@ -78,7 +67,6 @@ try:
         CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts(name);
         CREATE INDEX IF NOT EXISTS idx_contacts_phone_validated ON contacts(phone_validated_at);
     """)
-    conn.commit()
     print("   ✅ New contacts table created")
     print()
     
@@ -101,95 +89,102 @@ try:
         CREATE INDEX IF NOT EXISTS idx_permit_contacts_permit ON permit_contacts(permit_id);
         CREATE INDEX IF NOT EXISTS idx_permit_contacts_contact ON permit_contacts(contact_id);
     """)
-    conn.commit()
     print("   ✅ Junction table created")
     print()
     
-    # Step 4: Extract and insert unique contacts in ONE bulk operation
+    # Step 4: Extract unique contacts and bulk insert them
+    # Both permit scans are streamed through a server-side cursor and deduped on
+    # phone here, instead of one DISTINCT ON sort over every row (which spills to
+    # disk past work_mem on a large permits table). A phone listed under both
+    # roles is kept as 'Owner': each row carries a role_priority (Owner 1,
+    # Permittee 2) and the lowest wins, whatever order the rows stream in.
     print("Step 4: Extracting and inserting unique contacts...")
     
-    cur.execute("""
-        INSERT INTO contacts (name, phone, role)
-        SELECT DISTINCT ON (phone) 
-            name, 
-            phone, 
-            role
-        FROM (
-            -- Permittee contacts
-            SELECT 
-                COALESCE(permittee_business_name, applicant) as name,
-                REGEXP_REPLACE(permittee_phone, '[^0-9]', '', 'g') as phone,
-                'Permittee' as role
-            FROM permits
-            WHERE permittee_phone IS NOT NULL 
-            AND permittee_phone != ''
-            AND LENGTH(REGEXP_REPLACE(permittee_phone, '[^0-9]', '', 'g')) = 10
-            
-            UNION ALL
-            
-            -- Owner contacts
-            SELECT 
-                owner_business_name as name,
-                REGEXP_REPLACE(owner_phone, '[^0-9]', '', 'g') as phone,
-                'Owner' as role
-            FROM permits
-            WHERE owner_phone IS NOT NULL 
-            AND owner_phone != ''
-            AND LENGTH(REGEXP_REPLACE(owner_phone, '[^0-9]', '', 'g')) = 10
-        ) all_contacts
-        ORDER BY phone, role
-        ON CONFLICT (phone) DO NOTHING
-    """)
-    
-    inserted = cur.rowcount
-    conn.commit()
-    print(f"   ✅ Inserted {inserted} unique contacts")
+    contacts_by_phone = {}
+    with conn.cursor(name='contact_extract') as stream_cur:
+        stream_cur.itersize = CONTACT_BATCH_SIZE
+        stream_cur.execute("""
+            SELECT name, phone, role, role_priority
+            FROM (
+                -- Owner contacts
+                SELECT 
+                    owner_business_name as name,
+                    REGEXP_REPLACE(owner_phone, '[^0-9]', '', 'g') as phone,
+                    'Owner' as role,
+                    1 as role_priority
+                FROM permits
+                WHERE owner_phone IS NOT NULL AND owner_phone != ''
+                
+                UNION ALL
+                
+                -- Permittee contacts
+                SELECT 
+                    COALESCE(permittee_business_name, applicant) as name,
+                    REGEXP_REPLACE(permittee_phone, '[^0-9]', '', 'g') as phone,
+                    'Permittee' as role,
+                    2 as role_priority
+                FROM permits
+                WHERE permittee_phone IS NOT NULL AND permittee_phone != ''
+            ) all_contacts
+            WHERE LENGTH(phone) = 10
+        """)
+        for name, phone, role, role_priority in stream_cur:
+            kept = contacts_by_phone.get(phone)
+            if kept is None or role_priority < kept[0]:
+                contacts_by_phone[phone] = (role_priority, (name, phone, role))
+    
+    inserted = psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO contacts (name, phone, role) VALUES %s ON CONFLICT (phone) DO NOTHING RETURNING id",
+        [contact for _, contact in contacts_by_phone.values()],
+        page_size=CONTACT_BATCH_SIZE,
+        fetch=True
+    )
+    
+    print(f"   ✅ Inserted {len(inserted)} unique contacts")
     print()
     
     # Step 5: Link permits to contacts via junction table
     print("Step 5: Linking permits to contacts...")
     
-    # Link permittee contacts
+    # Both roles in one pass over permits: each row's two phones are normalized
+    # once and unpivoted, so permits is scanned once instead of once per role.
+    # (The join reads every permit, so an index on the normalized phone wouldn't
+    # be used; contacts.phone is already indexed by its UNIQUE constraint.)
     cur.execute("""
-        INSERT INTO permit_contacts (permit_id, contact_id, contact_role)
-        SELECT DISTINCT p.id, c.id, 'Permittee'
-        FROM permits p
-        JOIN contacts c ON REGEXP_REPLACE(p.permittee_phone, '[^0-9]', '', 'g') = c.phone
-        WHERE p.permittee_phone IS NOT NULL
-        ON CONFLICT (permit_id, contact_id, contact_role) DO NOTHING
+        WITH linked AS (
+            INSERT INTO permit_contacts (permit_id, contact_id, contact_role)
+            SELECT DISTINCT p.id, c.id, v.role
+            FROM permits p
+            CROSS JOIN LATERAL (VALUES
+                ('Permittee', REGEXP_REPLACE(p.permittee_phone, '[^0-9]', '', 'g')),
+                ('Owner', REGEXP_REPLACE(p.owner_phone, '[^0-9]', '', 'g'))
+            ) v(role, phone)
+            JOIN contacts c ON c.phone = v.phone
+            WHERE p.permittee_phone IS NOT NULL OR p.owner_phone IS NOT NULL
+            ON CONFLICT (permit_id, contact_id, contact_role) DO NOTHING
+            RETURNING contact_role
+        )
+        SELECT contact_role, COUNT(*) AS links FROM linked GROUP BY contact_role
     """)
-    permittee_links = cur.rowcount
-    print(f"   ✅ Linked {permittee_links} permittee contacts to permits")
-    
-    # Link owner contacts
-    cur.execute("""
-        INSERT INTO permit_contacts (permit_id, contact_id, contact_role)
-        SELECT DISTINCT p.id, c.id, 'Owner'
-        FROM permits p
-        JOIN contacts c ON REGEXP_REPLACE(p.owner_phone, '[^0-9]', '', 'g') = c.phone
-        WHERE p.owner_phone IS NOT NULL
-        ON CONFLICT (permit_id, contact_id, contact_role) DO NOTHING
-    """)
-    owner_links = cur.rowcount
-    print(f"   ✅ Linked {owner_links} owner contacts to permits")
+    links_by_role = dict(cur.fetchall())
+    print(f"   ✅ Linked {links_by_role.get('Permittee', 0)} permittee contacts to permits")
+    print(f"   ✅ Linked {links_by_role.get('Owner', 0)} owner contacts to permits")
     
+    # Steps 2-5 commit together: one WAL flush, and a failure in any of them
+    # rolls back to just the step 1 rename (handled in the except below)
     conn.commit()
     print()
     
-    # Step 6: Verification
+    # Step 6: Verification (all three counts in one round-trip)
     print("Step 6: Verification...")
-    cur.execute("SELECT COUNT(*) FROM contacts")
-    contact_count = cur.fetchone()['count']
-    
-    cur.execute("SELECT COUNT(*) FROM permit_contacts")
-    link_count = cur.fetchone()['count']
-    
     cur.execute("""
-        SELECT COUNT(DISTINCT p.id) 
-        FROM permits p
-        JOIN permit_contacts pc ON p.id = pc.permit_id
+        SELECT
+            (SELECT COUNT(*) FROM contacts) AS contact_count,
+            (SELECT COUNT(*) FROM permit_contacts) AS link_count,
+            (SELECT COUNT(DISTINCT permit_id) FROM permit_contacts) AS permits_with_contacts
     """)
-    permits_with_contacts = cur.fetchone()['count']
+    contact_count, link_count, permits_with_contacts = cur.fetchone()
     
     print(f"   📊 Total contacts: {contact_count}")
     print(f"   📊 Total links: {link_count}")
@@ -198,19 +193,25 @@ try:
     
     # Step 7: Show sample data
     print("Step 7: Sample data...")
+    # Rank contacts on permit_contacts alone, then join just the top 5 to contacts
     cur.execute("""
-        SELECT c.name, c.phone, c.role, COUNT(pc.permit_id) as permit_count
-        FROM contacts c
-        LEFT JOIN permit_contacts pc ON c.id = pc.contact_id
-        GROUP BY c.id, c.name, c.phone, c.role
-        ORDER BY permit_count DESC
-        LIMIT 5
+        WITH top AS (
+            SELECT contact_id, COUNT(*) AS permit_count
+            FROM permit_contacts
+            GROUP BY contact_id
+            ORDER BY permit_count DESC
+            LIMIT 5
+        )
+        SELECT c.name, c.phone, c.role, top.permit_count
+        FROM top
+        JOIN contacts c ON c.id = top.contact_id
+        ORDER BY top.permit_count DESC
     """)
     samples = cur.fetchall()
     
     print("   Top 5 contacts by permit count:")
-    for sample in samples:
-        print(f"   - {sample['name'][:40]:<40} | {sample['phone']:<12} | {sample['role']:<10} | {sample['permit_count']} permits")
+    for name, phone, role, permit_count in samples:
+        print(f"   - {(name or '')[:40]:<40} | {phone:<12} | {role:<10} | {permit_count} permits")
     print()
     
     # Step 8: Offer to drop old backup
@@ -25,11 +25,18 @@ Author: Matthew Makh
 """
 
 import asyncio
+import atexit
 import re
+import threading
 import random
 import logging
-from dataclasses import dataclass, field
-from datetime import datetime
+import time
+import orjson
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import List, Dict, Optional, Tuple
 
 try:
@@ -37,6 +44,14 @@ try:
 except ImportError:
     raise ImportError("httpx is required. Install with: pip install httpx")
 
+# HTTP/2 is optional (pip install 'httpx[http2]'): lets concurrent lookups
+# multiplex over one connection. httpx falls back to HTTP/1.1 without it.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 log = logging.getLogger(__name__)
 
 
@@ -44,7 +59,7 @@ log = logging.getLogger(__name__)
 # DATA CLASSES - Clean Output Types
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class SOSPerson:
     """A person associated with a business (CEO, Agent, etc.)"""
     full_name: str
@@ -67,7 +82,7 @@ class SOSPerson:
         return ", ".join(parts)
 
 
-@dataclass
+@dataclass(slots=True)
 class SOSBusinessResult:
     """Result of a business lookup."""
     # Search info
@@ -88,7 +103,7 @@ class SOSBusinessResult:
     # The people you want!
     people: List[SOSPerson] = field(default_factory=list)
     
-    # Raw data for debugging
+    # Raw data for debugging (only kept with AsyncNYSOSClient(keep_raw=True))
     raw_response: dict = field(default_factory=dict)
     
     def get_ceo(self) -> Optional[SOSPerson]:
@@ -114,33 +129,53 @@ class SOSBusinessResult:
 # NAME NORMALIZATION UTILITIES
 # ============================================================================
 
+# Trailing location, e.g. "ACME LLC - BROOKLYN, NY 11201"
+_LOC_SUFFIX_RE = re.compile(r'\s*-\s*[A-Z\s]+,\s*[A-Z]{2}(\s+\d{5})?$', re.IGNORECASE)
+
+# Common business suffixes, as one alternation so a name is scanned once
+_BUSINESS_SUFFIX_RE = re.compile('|'.join([
+    r'\bLLC\b', r'\bL\.L\.C\.', r'\bINC\b', r'\bINC\.', r'\bINCORPORATED\b',
+    r'\bCORP\b', r'\bCORP\.', r'\bCORPORATION\b', r'\bLTD\b', r'\bLTD\.',
+    r'\bLIMITED\b', r'\bLP\b', r'\bL\.P\.', r'\bLLP\b', r'\bL\.L\.P\.',
+    r'\bPC\b', r'\bP\.C\.', r'\bPLLC\b', r'\bP\.L\.L\.C\.', r'\bCO\b',
+    r'\bCO\.', r'\bCOMPANY\b', r'\bDBA\b', r'\bD/B/A\b', r'\bD\.B\.A\.',
+    r'\bUSA\b', r'\bU\.S\.A\.'
+]))
+
+# Whole-word corporate indicators for is_likely_individual (so 'LP' doesn't
+# match ALPHA or 'CO.' match MARCO.) and the shorter list for _is_person_name
+_CORP_INDICATOR_RE = re.compile(
+    r'(?<!\w)(?:LLC|L\.L\.C\.|INC\.?|CORP\.?|CORPORATION|LTD\.?|LIMITED|LP|L\.P\.|LLP|L\.L\.P\.'
+    r'|COMPANY|CO\.|GROUP|SERVICES|ASSOCIATES|PARTNERS|ENTERPRISES|HOLDINGS|MANAGEMENT'
+    r'|CONSULTING|AGENCY|TRUST|FUND|BANK|FOUNDATION|INSTITUTE|PC|P\.C\.|PLLC|P\.L\.L\.C\.'
+    r'|DBA|D/B/A)(?!\w)'
+)
+_COMPANY_INDICATOR_RE = re.compile(
+    r'(?<!\w)(?:LLC|INC|CORP|CORPORATION|LTD|LIMITED|LP|LLP|COMPANY|GROUP|SERVICES'
+    r'|ASSOCIATES|PARTNERS|TRUST|FUND|BANK|FOUNDATION)(?!\w)'
+)
+
+_USA_SUFFIX_RE = re.compile(r'\s+(USA|U\.S\.A\.)$', re.IGNORECASE)
+_US_DATE_SEP_RE = re.compile(r'[/-]')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=16384)
 def normalize_business_name(name: str) -> str:
     """
     Normalize business name for deduplication and caching.
+    Memoized - batch lookups see the same names repeatedly. Long-running
+    callers can free the cache with normalize_business_name.cache_clear().
     """
     if not name:
         return ""
     
     name = name.upper().strip()
-    
-    # Remove location suffix
-    name = re.sub(r'\s*-\s*[A-Z\s]+,\s*[A-Z]{2}(\s+\d{5})?$', '', name, flags=re.IGNORECASE)
-    
-    # Remove common business suffixes
-    suffixes = [
-        r'\bLLC\b', r'\bL\.L\.C\.', r'\bINC\b', r'\bINC\.', r'\bINCORPORATED\b',
-        r'\bCORP\b', r'\bCORP\.', r'\bCORPORATION\b', r'\bLTD\b', r'\bLTD\.',
-        r'\bLIMITED\b', r'\bLP\b', r'\bL\.P\.', r'\bLLP\b', r'\bL\.L\.P\.',
-        r'\bPC\b', r'\bP\.C\.', r'\bPLLC\b', r'\bP\.L\.L\.C\.', r'\bCO\b',
-        r'\bCO\.', r'\bCOMPANY\b', r'\bDBA\b', r'\bD/B/A\b', r'\bD\.B\.A\.',
-        r'\bUSA\b', r'\bU\.S\.A\.'
-    ]
-    
-    for suffix in suffixes:
-        name = re.sub(suffix, '', name)
-    
-    name = re.sub(r'[^\w\s]', '', name)
-    name = re.sub(r'\s+', ' ', name)
+    name = _LOC_SUFFIX_RE.sub('', name)
+    name = _BUSINESS_SUFFIX_RE.sub('', name)
+    name = _NON_WORD_RE.sub('', name)
+    name = _WHITESPACE_RE.sub(' ', name)
     
     return name.strip()
 
@@ -150,20 +185,8 @@ def is_likely_individual(name: str) -> bool:
     if not name:
         return False
     
-    name_upper = name.upper()
-    
-    corp_indicators = [
-        'LLC', 'L.L.C.', 'INC', 'INC.', 'CORP', 'CORP.', 'CORPORATION',
-        'LTD', 'LTD.', 'LIMITED', 'LP', 'L.P.', 'LLP', 'L.L.P.',
-        'COMPANY', 'CO.', 'GROUP', 'SERVICES', 'ASSOCIATES', 'PARTNERS',
-        'ENTERPRISES', 'HOLDINGS', 'MANAGEMENT', 'CONSULTING', 'AGENCY',
-        'TRUST', 'FUND', 'BANK', 'FOUNDATION', 'INSTITUTE', 'PC', 'P.C.',
-        'PLLC', 'P.L.L.C.', 'DBA', 'D/B/A'
-    ]
-    
-    for indicator in corp_indicators:
-        if indicator in name_upper:
-            return False
+    if _CORP_INDICATOR_RE.search(name.upper()):
+        return False
     
     words = name.split()
     if len(words) < 2 or len(words) > 4:
@@ -179,21 +202,18 @@ def _is_person_name(name: str) -> bool:
     """Check if a name looks like a person vs a company."""
     if not name:
         return False
-    name_upper = name.upper()
-    company_indicators = [
-        'LLC', 'INC', 'CORP', 'CORPORATION', 'LTD', 'LIMITED', 'LP', 'LLP',
-        'COMPANY', 'GROUP', 'SERVICES', 'ASSOCIATES', 'PARTNERS',
-        'TRUST', 'FUND', 'BANK', 'FOUNDATION'
-    ]
-    for indicator in company_indicators:
-        if indicator in name_upper:
-            return False
+    if _COMPANY_INDICATOR_RE.search(name.upper()):
+        return False
     words = name.split()
     return 2 <= len(words) <= 5
 
 
+@lru_cache(maxsize=4096)
 def _parse_name(full_name: str) -> Tuple[str, str, str]:
-    """Parse a full name into (first, middle, last) components."""
+    """
+    Parse a full name into (first, middle, last) components.
+    Memoized - registered agents (CT Corporation, CSC, ...) recur constantly.
+    """
     if not full_name:
         return ('', '', '')
     parts = full_name.strip().split()
@@ -205,45 +225,149 @@ def _parse_name(full_name: str) -> Tuple[str, str, str]:
         return (parts[0], ' '.join(parts[1:-1]), parts[-1])
 
 
+@lru_cache(maxsize=16384)
 def _clean_business_name_for_search(name: str) -> str:
     """Clean business name for API searching."""
     if not name:
         return ""
-    name = re.sub(r'\s*-\s*[A-Z\s]+,\s*[A-Z]{2}(\s+\d{5})?$', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s+(USA|U\.S\.A\.)$', '', name, flags=re.IGNORECASE)
+    name = _LOC_SUFFIX_RE.sub('', name)
+    name = _USA_SUFFIX_RE.sub('', name)
     return name.strip()
 
 
-def _parse_formation_date(date_str: Optional[str]) -> Optional[datetime]:
-    """Parse formation date with multiple format support."""
-    if not date_str:
-        return None
-    
-    formats = ['%Y-%m-%d', '%m/%d/%Y', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%m-%d-%Y']
+def _search_key(name: str) -> str:
+    """Case- and spacing-insensitive form of a name's search string (dedup / cache key)."""
+    return ' '.join(_clean_business_name_for_search(name).upper().split())
+
+
+def _compute_backoff(prev: float, response: Optional["httpx.Response"] = None) -> float:
+    """
+    Seconds to wait before the next retry.
     
-    for fmt in formats:
+    Honors a Retry-After header (seconds or HTTP date) on `response`; otherwise
+    decorrelated jitter from the previous delay `prev`, so retries from a
+    lookup_many fan-out don't all wake at once. Both are capped at BACKOFF_CAP.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
         try:
-            return datetime.strptime(date_str, fmt)
+            delay = float(retry_after)
         except ValueError:
-            continue
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(BACKOFF_CAP, max(0.0, delay))
+    return min(BACKOFF_CAP, random.uniform(BACKOFF_BASE, prev * 3))
+
+
+def _parse_formation_date(date_str: Optional[str]) -> Optional[datetime]:
+    """
+    Parse formation date: ISO (what the API returns, with or without a time)
+    or US month/day/year with '/' or '-'. Dispatches on the shape of the
+    string rather than trying each format until one stops raising.
+    """
+    if not date_str:
+        return None
     
-    return None
+    try:
+        if date_str[4:5] == '-':
+            return datetime.fromisoformat(date_str)
+        month, day, year = _US_DATE_SEP_RE.split(date_str)
+        if len(year) != 4:
+            return None
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 
 # ============================================================================
 # ASYNC NY SOS API CLIENT
 # ============================================================================
 
+# Search page size for a single name's search
+NAME_SEARCH_MAX_RESULTS = 50
+
+# (our key, API key) for each entity search result
+_SEARCH_RESULT_FIELDS = (
+    ('dos_id', 'dosID'),
+    ('entity_name', 'entityName'),
+    ('entity_status', 'entityStatus'),
+    ('entity_type', 'entityType'),
+    ('jurisdiction', 'jurisdiction'),
+    ('formation_date', 'formationDate'),
+)
+
+# Request bodies, serialized once; the "__...__" placeholders are swapped for
+# the JSON-encoded values per request (Content-Type is in the client headers)
+_SEARCH_BODY_TEMPLATE = orjson.dumps({
+    'searchValue': '__SEARCH_VALUE__',
+    'searchByTypeIndicator': 'EntityName',
+    'searchExpressionIndicator': 'BeginsWith',
+    'entityStatusIndicator': 'AllStatuses',
+    'entityTypeIndicator': [
+        'Corporation',
+        'LimitedLiabilityCompany',
+        'LimitedPartnership',
+        'LimitedLiabilityPartnership',
+    ],
+    'listPaginationInfo': {
+        'listStartRecord': 1,
+        'listEndRecord': NAME_SEARCH_MAX_RESULTS,
+    },
+})
+_DETAILS_BODY_TEMPLATE = orjson.dumps({
+    'SearchID': '__SEARCH_ID__',
+    'EntityName': '__ENTITY_NAME__',
+    'AssumedNameFlag': 'false',
+})
+
+# (entity record key, title) for each person on an entity record
+_PERSON_TITLES = (
+    ('ceo', 'CEO'),
+    ('sopAddress', 'Service of Process Agent'),
+    ('registeredAgent', 'Registered Agent'),
+)
+
+# Retry backoff bounds (seconds), see _compute_backoff
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Adaptive concurrency (see AsyncNYSOSClient._shrink / _record_success)
+AIMD_SUCCESS_RUN = 32
+AIMD_COOLDOWN = 5.0
+
+# Per-client response caches (seconds, entries per cache)
+SEARCH_CACHE_TTL = 24 * 3600
+DETAILS_CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 4096
+
+
 class AsyncNYSOSClient:
     """Async client for NY Department of State business lookup API."""
     
     BASE_URL = "https://apps.dos.ny.gov/PublicInquiryWeb/api/PublicInquiry"
     
-    def __init__(self, concurrency: int = 5, timeout: int = 30, max_retries: int = 3):
+    def __init__(self, concurrency: int = 5, timeout: int = 30, max_retries: int = 3, keep_raw: bool = False):
         self.concurrency = concurrency
         self.timeout = timeout
         self.max_retries = max_retries
-        self.semaphore = asyncio.Semaphore(concurrency)
+        # Keep each entity record's full JSON on the result (large; debugging only)
+        self.keep_raw = keep_raw
+        # Admission control: a counter under a Condition rather than a Semaphore,
+        # so a slot can be released while a lookup sleeps between retries and the
+        # limit can be changed at runtime (set_concurrency)
+        self._active = 0
+        self._admission = asyncio.Condition()
+        # AIMD on top of admission: _limit (<= concurrency) halves on 429/503
+        # and creeps back up by one every AIMD_SUCCESS_RUN successful lookups
+        self._limit = concurrency
+        self._success_run = 0
+        self._last_shrink = 0.0
+        # key -> (expires_at, task); see _cached
+        self._search_cache: OrderedDict = OrderedDict()
+        self._details_cache: OrderedDict = OrderedDict()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
             'Accept': 'application/json, text/plain, */*',
@@ -255,7 +379,18 @@ class AsyncNYSOSClient:
         self._client: Optional[httpx.AsyncClient] = None
     
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(headers=self.headers)
+        # One keep-alive pool shared by every lookup; sized to the concurrency so
+        # concurrent requests reuse connections instead of queueing for one
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+                keepalive_expiry=60,
+            ),
+        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -275,140 +410,225 @@ class AsyncNYSOSClient:
             result.error = "Empty business name"
             return result
         
-        async with self.semaphore:
-            for attempt in range(self.max_retries):
-                try:
-                    matches = await self._search_business(business_name)
-                    
-                    if not matches:
-                        return result
-                    
-                    active_matches = [m for m in matches if m.get('entity_status') == 'Active']
-                    selected = active_matches[0] if active_matches else matches[0]
-                    
-                    details = await self._get_business_details(
-                        selected['dos_id'], 
-                        selected['entity_name']
-                    )
-                    
-                    if not details:
-                        return result
-                    
-                    result.found = True
-                    result.dos_id = details.get('dos_id', '')
-                    result.entity_name = details.get('entity_name', '')
-                    result.entity_type = details.get('entity_type', '')
-                    result.status = details.get('status', '')
-                    result.jurisdiction = details.get('jurisdiction', '')
-                    result.formation_date = _parse_formation_date(details.get('formation_date'))
-                    result.county = details.get('county', '')
-                    result.people = details.get('people', [])
-                    result.raw_response = details.get('raw_response', {})
-                    
-                    return result
-                    
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code in (429, 503):
-                        sleep_time = (2 ** attempt) + random.random()
-                        await asyncio.sleep(sleep_time)
-                        continue
+        delay = BACKOFF_BASE
+        for attempt in range(self.max_retries):
+            response = None
+            await self._acquire()
+            try:
+                result = await self._lookup_once(business_name, result)
+                await self._record_success()
+                return result
+                
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (429, 503):
                     result.error = f"HTTP {e.response.status_code}"
                     return result
-                    
-                except (httpx.TimeoutException, httpx.ConnectError) as e:
-                    if attempt < self.max_retries - 1:
-                        await asyncio.sleep((2 ** attempt) + random.random())
-                        continue
+                response = e.response
+                await self._shrink()
+                
+            except (httpx.TimeoutException, httpx.ConnectError) as e:
+                if attempt == self.max_retries - 1:
                     result.error = f"Connection error: {e}"
                     return result
-                    
-                except Exception as e:
-                    result.error = str(e)
-                    return result
+                
+            except Exception as e:
+                result.error = str(e)
+                return result
+            
+            finally:
+                await self._release()
             
-            result.error = "Max retries exceeded"
+            # Back off without holding an admission slot
+            delay = _compute_backoff(delay, response)
+            await asyncio.sleep(delay)
+        
+        result.error = "Max retries exceeded"
+        return result
+    
+    async def _lookup_once(self, business_name: str, result: SOSBusinessResult) -> SOSBusinessResult:
+        """One search + details attempt; fills in `result` if the business is found."""
+        matches = await self._search_business(business_name)
+        
+        if not matches:
+            return result
+        
+        # First active entity, else the best match overall
+        selected = next((m for m in matches if m.get('entity_status') == 'Active'), matches[0])
+        
+        details = await self._get_business_details(
+            selected['dos_id'], 
+            selected['entity_name']
+        )
+        
+        if not details:
             return result
+        
+        result.found = True
+        result.dos_id = details.get('dos_id', '')
+        result.entity_name = details.get('entity_name', '')
+        result.entity_type = details.get('entity_type', '')
+        result.status = details.get('status', '')
+        result.jurisdiction = details.get('jurisdiction', '')
+        result.formation_date = _parse_formation_date(details.get('formation_date'))
+        result.county = details.get('county', '')
+        result.people = list(details.get('people', []))  # the details dict is cached
+        result.raw_response = details.get('raw_response', {})
+        
+        return result
+    
+    async def _acquire(self):
+        """Wait for an admission slot (at most `concurrency` lookups in flight)."""
+        async with self._admission:
+            await self._admission.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+    
+    async def _release(self):
+        """Free an admission slot and wake one waiter."""
+        async with self._admission:
+            self._active -= 1
+            self._admission.notify(1)
+    
+    async def set_concurrency(self, concurrency: int):
+        """
+        Change how many lookups may be in flight, e.g. to back off under 429s.
+        Takes effect as running lookups finish; the HTTP pool stays sized to
+        the initial concurrency.
+        """
+        async with self._admission:
+            self.concurrency = concurrency
+            self._limit = concurrency
+            self._admission.notify_all()
+    
+    async def _shrink(self):
+        """Halve the admission limit after a 429/503 (once per AIMD_COOLDOWN)."""
+        async with self._admission:
+            now = time.monotonic()
+            # One burst of throttled responses from concurrent lookups is
+            # one signal, not one halving each
+            if now - self._last_shrink < AIMD_COOLDOWN:
+                return
+            self._last_shrink = now
+            self._success_run = 0
+            self._limit = max(1, self._limit // 2)
+            log.debug(f"SOS throttled: concurrency limit -> {self._limit}")
+    
+    async def _record_success(self):
+        """Count a successful lookup; every AIMD_SUCCESS_RUN, raise the limit by one."""
+        if self._limit >= self.concurrency:
+            return
+        self._success_run += 1
+        if self._success_run >= AIMD_SUCCESS_RUN:
+            async with self._admission:
+                self._success_run = 0
+                self._limit = min(self.concurrency, self._limit + 1)
+                self._admission.notify_all()
     
     async def lookup_many(self, business_names: List[str]) -> Dict[str, SOSBusinessResult]:
-        """Look up multiple businesses concurrently."""
-        tasks = [self.lookup(name) for name in business_names]
-        results = await asyncio.gather(*tasks)
-        return {r.query_name: r for r in results}
+        """
+        Look up multiple businesses concurrently.
+        
+        Names that differ only in case or spacing ("Abc  Llc" / "ABC LLC") are
+        looked up once and the result copied to each spelling, so the returned
+        dict still has every name passed in as a key.
+        """
+        spellings: Dict[str, List[str]] = {}
+        for name in dict.fromkeys(business_names):
+            spellings.setdefault(_search_key(name), []).append(name)
+        
+        names = [group[0] for group in spellings.values()]
+        results = await asyncio.gather(*[self.lookup(name) for name in names])
+        
+        by_name = {}
+        for group, result in zip(spellings.values(), results):
+            by_name[group[0]] = result
+            for name in group[1:]:
+                by_name[name] = replace(
+                    result, query_name=name, normalized_name=normalize_business_name(name),
+                    people=list(result.people),
+                )
+        return by_name
+    
+    async def _cached(self, cache: OrderedDict, key, ttl: float, fetch):
+        """
+        Return the cached result for `key`, or run `fetch()` and cache it.
+        
+        The cache holds the fetch task itself, so concurrent callers with the
+        same key share one in-flight request. Failed fetches are not cached.
+        The event loop is single-threaded and nothing here awaits between the
+        lookup and the insert, so no lock is needed.
+        """
+        now = time.monotonic()
+        entry = cache.get(key)
+        if entry and entry[0] > now:
+            cache.move_to_end(key)
+            task = entry[1]
+        else:
+            task = asyncio.ensure_future(fetch())
+            cache[key] = (now + ttl, task)
+            if len(cache) > CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+            
+            def _drop_failed(t, key=key):
+                if (t.cancelled() or t.exception()) and cache.get(key, (None, None))[1] is t:
+                    del cache[key]
+            task.add_done_callback(_drop_failed)
+        # shield: one caller being cancelled mustn't cancel the others' request
+        return await asyncio.shield(task)
     
     async def _search_business(self, business_name: str) -> List[Dict]:
-        """Search for a business by name."""
+        """Search for a business by name (entity names beginning with it)."""
         search_name = _clean_business_name_for_search(business_name)
         if not search_name:
             return []
-        
-        json_data = {
-            'searchValue': search_name,
-            'searchByTypeIndicator': 'EntityName',
-            'searchExpressionIndicator': 'BeginsWith',
-            'entityStatusIndicator': 'AllStatuses',
-            'entityTypeIndicator': [
-                'Corporation',
-                'LimitedLiabilityCompany',
-                'LimitedPartnership',
-                'LimitedLiabilityPartnership',
-            ],
-            'listPaginationInfo': {
-                'listStartRecord': 1,
-                'listEndRecord': 50,
-            },
-        }
-        
+        return await self._cached(
+            self._search_cache, _search_key(search_name), SEARCH_CACHE_TTL,
+            lambda: self._fetch_search(search_name),
+        )
+    
+    async def _fetch_search(self, search_name: str) -> List[Dict]:
+        """POST the entity name search (uncached; use _search_business)."""
+        body = _SEARCH_BODY_TEMPLATE.replace(b'"__SEARCH_VALUE__"', orjson.dumps(search_name))
         response = await self._client.post(
             f"{self.BASE_URL}/GetComplexSearchMatchingEntities",
-            json=json_data,
-            timeout=self.timeout
+            content=body,
         )
         response.raise_for_status()
-        content = response.json()
+        content = orjson.loads(response.content)
         
-        results = []
-        for result in content.get('entitySearchResultList', []):
-            results.append({
-                'dos_id': result.get('dosID'),
-                'entity_name': result.get('entityName'),
-                'entity_status': result.get('entityStatus'),
-                'entity_type': result.get('entityType'),
-                'jurisdiction': result.get('jurisdiction'),
-                'formation_date': result.get('formationDate'),
-            })
-        
-        return results
+        return [
+            {name: result.get(key) for name, key in _SEARCH_RESULT_FIELDS}
+            for result in content.get('entitySearchResultList', [])
+        ]
     
     async def _get_business_details(self, dos_id: str, entity_name: str) -> Optional[Dict]:
         """Get detailed business information including owners."""
-        json_data = {
-            'SearchID': dos_id,
-            'EntityName': entity_name,
-            'AssumedNameFlag': 'false',
-        }
-        
+        return await self._cached(
+            self._details_cache, (dos_id, entity_name), DETAILS_CACHE_TTL,
+            lambda: self._fetch_details(dos_id, entity_name),
+        )
+    
+    async def _fetch_details(self, dos_id: str, entity_name: str) -> Optional[Dict]:
+        """POST the entity record request (uncached; use _get_business_details)."""
+        body = (
+            _DETAILS_BODY_TEMPLATE
+            .replace(b'"__SEARCH_ID__"', orjson.dumps(dos_id))
+            .replace(b'"__ENTITY_NAME__"', orjson.dumps(entity_name))
+        )
         response = await self._client.post(
             f"{self.BASE_URL}/GetEntityRecordByID",
-            json=json_data,
-            timeout=self.timeout
+            content=body,
         )
         response.raise_for_status()
-        content = response.json()
+        content = orjson.loads(response.content)
         
         # Extract people (CEO, agents)
         people = []
-        titles = {
-            'ceo': 'CEO',
-            'sopAddress': 'Service of Process Agent',
-            'registeredAgent': 'Registered Agent'
-        }
-        
-        for key, title in titles.items():
-            person_data = content.get(key, {})
-            if person_data and person_data.get('name'):
-                name = person_data.get('name', '')
+        for key, title in _PERSON_TITLES:
+            person_data = content.get(key)
+            name = person_data.get('name') if person_data else None
+            if name and not name.isspace():
                 first_name, middle_name, last_name = _parse_name(name)
-                address = person_data.get('address', {})
+                address = person_data.get('address') or {}
                 
                 people.append(SOSPerson(
                     full_name=name,
@@ -434,7 +654,7 @@ class AsyncNYSOSClient:
             'formation_date': entity_info.get('dateOfInitialDosFiling') or entity_info.get('effectiveDateInitialFiling'),
             'county': entity_info.get('county'),
             'people': people,
-            'raw_response': content,
+            'raw_response': content if self.keep_raw else {},
         }
 
 
@@ -442,6 +662,45 @@ class AsyncNYSOSClient:
 # SIMPLE SYNC WRAPPERS
 # ============================================================================
 
+# The sync wrappers share one event loop, running in a daemon thread, and one
+# open client per (concurrency, timeout), so repeated calls reuse the same
+# connection pool and caches instead of a fresh loop + TLS handshake each time
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_clients: Dict[Tuple[int, int], AsyncNYSOSClient] = {}
+_sync_lock = threading.Lock()
+
+
+def _run_sync(coro_fn, concurrency: int, timeout: int):
+    """Run `coro_fn(client)` on the shared loop with the shared client; block for the result."""
+    global _sync_loop
+    with _sync_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name='ny-sos-lookup', daemon=True).start()
+            atexit.register(_close_sync_clients)
+        key = (concurrency, timeout)
+        client = _sync_clients.get(key)
+        if client is None:
+            client = AsyncNYSOSClient(concurrency=concurrency, timeout=timeout)
+            asyncio.run_coroutine_threadsafe(client.__aenter__(), _sync_loop).result()
+            _sync_clients[key] = client
+    return asyncio.run_coroutine_threadsafe(coro_fn(client), _sync_loop).result()
+
+
+def _close_sync_clients():
+    """Close the shared clients and stop their loop (atexit)."""
+    async def _close_all():
+        for client in _sync_clients.values():
+            await client.__aexit__(None, None, None)
+        _sync_clients.clear()
+    
+    try:
+        asyncio.run_coroutine_threadsafe(_close_all(), _sync_loop).result(timeout=5)
+    except Exception as e:
+        log.debug(f"Error closing SOS clients: {e}")
+    _sync_loop.call_soon_threadsafe(_sync_loop.stop)
+
+
 def lookup_business(business_name: str, timeout: int = 30) -> SOSBusinessResult:
     """
     Look up a single business by name (synchronous).
@@ -453,11 +712,7 @@ def lookup_business(business_name: str, timeout: int = 30) -> SOSBusinessResult:
             if ceo:
                 print(f"CEO: {ceo.full_name}, {ceo.city}, {ceo.state}")
     """
-    async def _lookup():
-        async with AsyncNYSOSClient(timeout=timeout) as client:
-            return await client.lookup(business_name)
-    
-    return asyncio.run(_lookup())
+    return _run_sync(lambda client: client.lookup(business_name), 5, timeout)
 
 
 def lookup_businesses(
@@ -474,11 +729,7 @@ def lookup_businesses(
             if result.found:
                 print(f"{name}: {result.status}")
     """
-    async def _lookup_many():
-        async with AsyncNYSOSClient(concurrency=concurrency, timeout=timeout) as client:
-            return await client.lookup_many(business_names)
-    
-    return asyncio.run(_lookup_many())
+    return _run_sync(lambda client: client.lookup_many(business_names), concurrency, timeout)
 
 
 # ============================================================================
@@ -9,9 +9,9 @@ import os
 import sys
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Tuple
+from typing import Callable, Dict, Iterator, List, Tuple
 from dotenv import load_dotenv
-import threading
+from psycopg2.pool import ThreadedConnectionPool
 
 # Load .env from dashboard_html if root .env doesn't exist
 if os.path.exists('.env'):
@@ -24,168 +24,162 @@ from permit_scraper_api import (
     DOBNowFilingsClient,
     DOBNowApprovedClient,
     PermitDatabase,
-    DB_CONFIG
+    DB_CONFIG,
+    prepare_rows_bis,
+    prepare_rows_dob_now_filings,
+    prepare_rows_dob_now_approved,
 )
 
-# Thread-safe print
-print_lock = threading.Lock()
 
 def safe_print(msg):
-    with print_lock:
-        print(msg, flush=True)
+    """Thread-safe print: one write() per message, so lines from workers don't interleave"""
+    sys.stdout.write(f"{msg}\n")
+    sys.stdout.flush()
 
 
-def scrape_bis_permits(start_date: str, end_date: str) -> Tuple[str, int, int]:
+# Pages requested at once per source (3 sources -> up to 12 requests in flight)
+PAGE_PARALLELISM = int(os.getenv('SCRAPER_PAGE_PARALLELISM', '4'))
+
+
+def fetch_pages(fetch: Callable[[int], List[Dict]], batch_size: int,
+                parallelism: int = PAGE_PARALLELISM) -> Iterator[List[Dict]]:
+    """
+    Yield pages of `fetch(offset)` in offset order, keeping `parallelism`
+    requests in flight instead of waiting for each page before asking for
+    the next. Stops at the first empty or short page (the fetch_* clients
+    also return [] on an API error).
+    """
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        window = [executor.submit(fetch, i * batch_size) for i in range(parallelism)]
+        next_offset = parallelism * batch_size
+        try:
+            while window:
+                page = window.pop(0).result()
+                if not page:
+                    return
+                yield page
+                if len(page) < batch_size:
+                    return
+                window.append(executor.submit(fetch, next_offset))
+                next_offset += batch_size
+        finally:
+            # Past the end: drop requests that haven't started yet
+            for future in window:
+                future.cancel()
+
+
+def scrape_bis_permits(pool, start_date: str, end_date: str) -> Tuple[str, int, int]:
     """Scrape BIS Permit Issuance (legacy system)"""
     safe_print(f"\n📋 [BIS] Starting: {start_date} to {end_date}")
     
-    db = PermitDatabase(DB_CONFIG)
-    db.connect()
     client = NYCOpenDataClient(app_token=None)
     
     total_fetched = 0
-    total_inserted = 0
-    offset = 0
+    total_upserted = 0
     batch_size = 5000
     
-    while True:
+    with PermitDatabase.from_pool(pool) as db:
         try:
-            permits = client.fetch_permits(
-                start_date=start_date,
-                end_date=end_date,
-                limit=batch_size,
-                offset=offset
+            pages = fetch_pages(
+                lambda offset: client.fetch_permits(
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=batch_size,
+                    offset=offset
+                ),
+                batch_size
             )
-            
-            if not permits:
-                break
-            
-            total_fetched += len(permits)
-            safe_print(f"   [BIS] Fetched {total_fetched:,} records, inserting...")
-            
-            batch_inserted = 0
-            for i, p in enumerate(permits):
-                if db.insert_permit(p):
-                    total_inserted += 1
-                    batch_inserted += 1
-                if (i + 1) % 500 == 0:
-                    safe_print(f"   [BIS] Inserted {i+1}/{len(permits)} ({batch_inserted} new)...")
-            db.conn.commit()
-            safe_print(f"   [BIS] Batch complete: {batch_inserted} new records")
-            
-            if len(permits) < batch_size:
-                break
-            offset += batch_size
-            
+            for permits in pages:
+                total_fetched += len(permits)
+                safe_print(f"   [BIS] Fetched {total_fetched:,} records, inserting...")
+                
+                # One execute_values upsert per batch (commits per chunk)
+                rows, skipped = prepare_rows_bis(permits)
+                batch_upserted, failed_chunks = db.upsert_bis_permits(rows)
+                total_upserted += batch_upserted
+                safe_print(f"   [BIS] Batch complete: {batch_upserted} upserted, {skipped} skipped, {failed_chunks} failed chunks")
+        
         except Exception as e:
             safe_print(f"   [BIS] ⚠️ Error: {e}")
-            break
     
-    db.close()
-    safe_print(f"   [BIS] ✅ Done: {total_fetched:,} fetched, {total_inserted:,} inserted")
-    return ('bis', total_fetched, total_inserted)
+    safe_print(f"   [BIS] ✅ Done: {total_fetched:,} fetched, {total_upserted:,} upserted")
+    return ('bis', total_fetched, total_upserted)
 
 
-def scrape_dob_now_filings(start_date: str, end_date: str) -> Tuple[str, int, int]:
+def scrape_dob_now_filings(pool, start_date: str, end_date: str) -> Tuple[str, int, int]:
     """Scrape DOB NOW Job Filings (new applications)"""
     safe_print(f"\n⭐ [DOB NOW Filings] Starting: {start_date} to {end_date}")
     
-    db = PermitDatabase(DB_CONFIG)
-    db.connect()
     client = DOBNowFilingsClient(app_token=None)
     
     total_fetched = 0
-    total_inserted = 0
-    offset = 0
+    total_upserted = 0
     batch_size = 5000
     
-    while True:
+    with PermitDatabase.from_pool(pool) as db:
         try:
-            filings = client.fetch_filings(
-                start_date=start_date,
-                end_date=end_date,
-                limit=batch_size,
-                offset=offset
+            pages = fetch_pages(
+                lambda offset: client.fetch_filings(
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=batch_size,
+                    offset=offset
+                ),
+                batch_size
             )
-            
-            if not filings:
-                break
-            
-            total_fetched += len(filings)
-            safe_print(f"   [Filings] Fetched {total_fetched:,} records, inserting...")
-            
-            batch_inserted = 0
-            for i, f in enumerate(filings):
-                if db.insert_dob_now_filing(f):
-                    total_inserted += 1
-                    batch_inserted += 1
-                if (i + 1) % 500 == 0:
-                    safe_print(f"   [Filings] Inserted {i+1}/{len(filings)} ({batch_inserted} new)...")
-            db.conn.commit()
-            safe_print(f"   [Filings] Batch complete: {batch_inserted} new records")
-            
-            if len(filings) < batch_size:
-                break
-            offset += batch_size
-            
+            for filings in pages:
+                total_fetched += len(filings)
+                safe_print(f"   [Filings] Fetched {total_fetched:,} records, inserting...")
+                
+                # One execute_values upsert per batch (commits per chunk)
+                rows, skipped = prepare_rows_dob_now_filings(filings)
+                batch_upserted, failed_chunks = db.upsert_dob_now_filings(rows)
+                total_upserted += batch_upserted
+                safe_print(f"   [Filings] Batch complete: {batch_upserted} upserted, {skipped} skipped, {failed_chunks} failed chunks")
+        
         except Exception as e:
             safe_print(f"   [Filings] ⚠️ Error: {e}")
-            break
     
-    db.close()
-    safe_print(f"   [Filings] ✅ Done: {total_fetched:,} fetched, {total_inserted:,} inserted")
-    return ('filings', total_fetched, total_inserted)
+    safe_print(f"   [Filings] ✅ Done: {total_fetched:,} fetched, {total_upserted:,} upserted")
+    return ('filings', total_fetched, total_upserted)
 
 
-def scrape_dob_now_approved(start_date: str, end_date: str) -> Tuple[str, int, int]:
+def scrape_dob_now_approved(pool, start_date: str, end_date: str) -> Tuple[str, int, int]:
     """Scrape DOB NOW Approved Permits (issued permits)"""
     safe_print(f"\n✅ [DOB NOW Approved] Starting: {start_date} to {end_date}")
     
-    db = PermitDatabase(DB_CONFIG)
-    db.connect()
     client = DOBNowApprovedClient(app_token=None)
     
     total_fetched = 0
-    total_inserted = 0
-    offset = 0
+    total_upserted = 0
     batch_size = 5000
     
-    while True:
+    with PermitDatabase.from_pool(pool) as db:
         try:
-            permits = client.fetch_permits(
-                start_date=start_date,
-                end_date=end_date,
-                limit=batch_size,
-                offset=offset
+            pages = fetch_pages(
+                lambda offset: client.fetch_permits(
+                    start_date=start_date,
+                    end_date=end_date,
+                    limit=batch_size,
+                    offset=offset
+                ),
+                batch_size
             )
-            
-            if not permits:
-                break
-            
-            total_fetched += len(permits)
-            safe_print(f"   [Approved] Fetched {total_fetched:,} records, inserting...")
-            
-            batch_inserted = 0
-            for i, p in enumerate(permits):
-                if db.insert_dob_now_approved(p):
-                    total_inserted += 1
-                    batch_inserted += 1
-                if (i + 1) % 500 == 0:
-                    safe_print(f"   [Approved] Inserted {i+1}/{len(permits)} ({batch_inserted} new)...")
-            db.conn.commit()
-            safe_print(f"   [Approved] Batch complete: {batch_inserted} new records")
-            
-            if len(permits) < batch_size:
-                break
-            offset += batch_size
-            
+            for permits in pages:
+                total_fetched += len(permits)
+                safe_print(f"   [Approved] Fetched {total_fetched:,} records, inserting...")
+                
+                # One execute_values upsert per batch (commits per chunk)
+                rows, skipped = prepare_rows_dob_now_approved(permits)
+                batch_upserted, failed_chunks = db.upsert_dob_now_approved(rows)
+                total_upserted += batch_upserted
+                safe_print(f"   [Approved] Batch complete: {batch_upserted} upserted, {skipped} skipped, {failed_chunks} failed chunks")
+        
         except Exception as e:
             safe_print(f"   [Approved] ⚠️ Error: {e}")
-            break
     
-    db.close()
-    safe_print(f"   [Approved] ✅ Done: {total_fetched:,} fetched, {total_inserted:,} inserted")
-    return ('approved', total_fetched, total_inserted)
+    safe_print(f"   [Approved] ✅ Done: {total_fetched:,} fetched, {total_upserted:,} upserted")
+    return ('approved', total_fetched, total_upserted)
 
 
 def run_parallel_scraper(start_date: str, end_date: str):
@@ -207,26 +201,30 @@ def run_parallel_scraper(start_date: str, end_date: str):
     
     # Track totals
     totals = {
-        'bis_fetched': 0, 'bis_inserted': 0,
-        'filings_fetched': 0, 'filings_inserted': 0,
-        'approved_fetched': 0, 'approved_inserted': 0
+        'bis_fetched': 0, 'bis_upserted': 0,
+        'filings_fetched': 0, 'filings_upserted': 0,
+        'approved_fetched': 0, 'approved_upserted': 0
     }
     
-    # Run all 3 sources in parallel
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {
-            executor.submit(scrape_bis_permits, start_date, end_date): 'bis',
-            executor.submit(scrape_dob_now_filings, start_date, end_date): 'filings',
-            executor.submit(scrape_dob_now_approved, start_date, end_date): 'approved'
-        }
-        
-        for future in as_completed(futures):
-            try:
-                source, fetched, inserted = future.result()
-                totals[f'{source}_fetched'] = fetched
-                totals[f'{source}_inserted'] = inserted
-            except Exception as e:
-                print(f"⚠️ Source failed: {e}")
+    # Run all 3 sources in parallel, each on a connection from one shared pool
+    pool = ThreadedConnectionPool(minconn=1, maxconn=3, **DB_CONFIG)
+    try:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                executor.submit(scrape_bis_permits, pool, start_date, end_date): 'bis',
+                executor.submit(scrape_dob_now_filings, pool, start_date, end_date): 'filings',
+                executor.submit(scrape_dob_now_approved, pool, start_date, end_date): 'approved'
+            }
+            
+            for future in as_completed(futures):
+                try:
+                    source, fetched, upserted = future.result()
+                    totals[f'{source}_fetched'] = fetched
+                    totals[f'{source}_upserted'] = upserted
+                except Exception as e:
+                    print(f"⚠️ Source failed: {e}")
+    finally:
+        pool.closeall()
     
     elapsed = (datetime.now() - start_time).total_seconds()
     
@@ -238,26 +236,26 @@ def run_parallel_scraper(start_date: str, end_date: str):
     
     print(f"\n🏛️  BIS Permits (Legacy):")
     print(f"    Fetched: {totals['bis_fetched']:,}")
-    print(f"    Inserted: {totals['bis_inserted']:,}")
+    print(f"    Upserted (new + updated): {totals['bis_upserted']:,}")
     
     print(f"\n⭐ DOB NOW Filings:")
     print(f"    Fetched: {totals['filings_fetched']:,}")
-    print(f"    Inserted: {totals['filings_inserted']:,}")
+    print(f"    Upserted (new + updated): {totals['filings_upserted']:,}")
     
     print(f"\n✅ DOB NOW Approved:")
     print(f"    Fetched: {totals['approved_fetched']:,}")
-    print(f"    Inserted: {totals['approved_inserted']:,}")
+    print(f"    Upserted (new + updated): {totals['approved_upserted']:,}")
     
     total_fetched = totals['bis_fetched'] + totals['filings_fetched'] + totals['approved_fetched']
-    total_inserted = totals['bis_inserted'] + totals['filings_inserted'] + totals['approved_inserted']
+    total_upserted = totals['bis_upserted'] + totals['filings_upserted'] + totals['approved_upserted']
     
     print(f"\n📈 GRAND TOTAL:")
     print(f"    Total Fetched: {total_fetched:,}")
-    print(f"    Total Inserted: {total_inserted:,}")
-    print(f"    Duplicates Skipped: {total_fetched - total_inserted:,}")
+    print(f"    Total Upserted (new + updated): {total_upserted:,}")
+    print(f"    Not Upserted (invalid/duplicate records, failed chunks): {total_fetched - total_upserted:,}")
     print("=" * 80)
     
-    return total_inserted
+    return total_upserted
 
 
 if __name__ == "__main__":
@@ -8,7 +8,7 @@ import re
 import subprocess
 import shutil
 from datetime import datetime
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 import mysql.connector
 import psycopg2
 import psycopg2.extras
@@ -205,19 +205,20 @@ def get_or_create_job(cursor, conn, config):
 
 def extract_permits_from_page(driver):
     """Extract permit data from current page"""
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    rows = soup.select("body > center > table:nth-of-type(3) > tbody > tr")
+    # Lexbor parses and runs the CSS selectors in C (much faster than bs4's html.parser)
+    tree = LexborHTMLParser(driver.page_source)
+    rows = tree.css("body > center > table:nth-of-type(3) > tbody > tr")
     permits = []
     
     for row in rows:
-        cols = row.find_all("td")
-        if len(cols) != 7 or "APPLICANT" in cols[0].get_text().upper():
+        cols = row.css("td")
+        if len(cols) != 7 or "APPLICANT" in cols[0].text().upper():
             continue
         
-        permit_link = cols[1].find("a")
-        link = f"https://a810-bisweb.nyc.gov/bisweb/{permit_link['href']}" if permit_link else ""
+        permit_link = cols[1].css_first("a")
+        link = f"https://a810-bisweb.nyc.gov/bisweb/{permit_link.attributes.get('href') or ''}" if permit_link else ""
         
-        permit_data = [col.get_text(strip=True).replace('\xa0', ' ') for col in cols]
+        permit_data = [col.text(strip=True).replace('\xa0', ' ') for col in cols]
         permit_data.append(link)
         permits.append(permit_data)
     
@@ -116,6 +116,7 @@ from psycopg2.extras import execute_values
 from typing import List, Dict, Optional, Tuple, Any
 import time
 import json
+from contextlib import contextmanager
 
 # =============================================================================
 # CONFIGURATION
@@ -1261,6 +1262,23 @@ class PermitDatabase:
         self.cursor = self.conn.cursor()
         print("🔌 Connected to database")
     
+    @classmethod
+    @contextmanager
+    def from_pool(cls, pool):
+        """
+        PermitDatabase on a connection borrowed from a psycopg2 pool,
+        returned to the pool on exit (instead of connect()/close()).
+        """
+        db = cls(config={})
+        db.conn = pool.getconn()
+        db.cursor = db.conn.cursor()
+        try:
+            yield db
+        finally:
+            db.cursor.close()
+            db.conn.rollback()  # don't hand back a connection mid-transaction
+            pool.putconn(db.conn)
+    
     def close(self):
         """Close database connection"""
         if self.cursor: